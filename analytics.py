@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+微博数据统计分析
+合并多个抓取输出目录，按用户和时间段计算发布频率、互动数据等统计指标
+"""
+
+import os
+import re
+import glob
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from weibo_scraper import CST, normalize_created_at
+from output_writer import COMPRESSION_EXTENSIONS
+from output_reader import iter_records, find_output_file
+
+COUNTER_COLUMNS = ['attitudes_count', 'reposts_count', 'comments_count']
+LOAD_COLUMNS = ['id', 'user_id', 'created_at', 'created_timestamp', 'retweeted_status', 'retweeted_id'] + COUNTER_COLUMNS
+DIR_TIME_PATTERN = re.compile(r'(\d{8}_\d{6})$')
+
+def parse_count(value):
+    """解析粉丝数等计数，接口对大数会返回"1.2万"、"100万+"这样的字符串"""
+    if value is None or value == '':
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip().rstrip('+')
+    for unit, factor in (('亿', 1e8), ('万', 1e4)):
+        if value.endswith(unit):
+            return float(value[:-1]) * factor
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+class WeiboAnalytics:
+    def __init__(self):
+        self.posts = None
+        self.users = None
+
+    @staticmethod
+    def find_output_dirs(root='.'):
+        """查找所有抓取输出目录"""
+        return sorted(d for d in glob.glob(os.path.join(root, 'weibo_data_*')) if os.path.isdir(d))
+
+    def _load_dir(self, output_dir):
+        """加载单个输出目录，返回 (微博DataFrame, 用户信息)"""
+        csv_files = [f for f in (os.path.join(output_dir, 'weibos.csv' + suffix)
+                                 for suffix in ('', *COMPRESSION_EXTENSIONS.values())) if os.path.exists(f)]
+        records_file = find_output_file(output_dir)
+        if csv_files:
+            # pandas 按扩展名自动解压
+            df = pd.read_csv(csv_files[0], usecols=lambda c: c in LOAD_COLUMNS, dtype={'id': str, 'user_id': str},
+                             encoding='utf-8-sig')
+        elif records_file:
+            df = pd.DataFrame.from_records(
+                ({column: record.get(column) for column in LOAD_COLUMNS if column in record}
+                 for record in iter_records(records_file)))
+            if df.empty:
+                return None, None
+            for column in ('id', 'user_id'):
+                df[column] = df[column].map(lambda v: None if v is None else str(v))
+        else:
+            return None, None
+
+        # 目录名中的时间即抓取时间，旧数据的相对时间需要以它为基准换算
+        match = DIR_TIME_PATTERN.search(output_dir.rstrip(os.sep))
+        scraped_at = (datetime.strptime(match.group(1), '%Y%m%d_%H%M%S').replace(tzinfo=CST)
+                      if match else datetime.now(CST))
+        if 'created_timestamp' not in df.columns:
+            df['created_timestamp'] = [
+                created.timestamp() if created else np.nan
+                for created in (normalize_created_at(str(v), scraped_at) if isinstance(v, str) else None
+                                for v in df['created_at'])
+            ]
+        df['scraped_at'] = scraped_at.timestamp()
+
+        user_info = {}
+        user_info_file = os.path.join(output_dir, 'user_info.json')
+        if os.path.exists(user_info_file):
+            with open(user_info_file, 'r', encoding='utf-8') as f:
+                user_info = json.load(f)
+        return df, user_info
+
+    @staticmethod
+    def _parse_counts(values):
+        """互动数列转为数值，"100万+"这样的字符串按 parse_count 换算，无法解析的记为0"""
+        counts = pd.to_numeric(values, errors='coerce')
+        unparsed = counts.isna() & values.notna()
+        if unparsed.any():
+            counts[unparsed] = values[unparsed].map(parse_count)
+        return counts.fillna(0).clip(0, np.iinfo(np.uint32).max).astype(np.uint32)
+
+    def _compact(self, df):
+        """转换为省内存的数据类型"""
+        for column in COUNTER_COLUMNS:
+            df[column] = self._parse_counts(df[column])
+        df['is_repost'] = df['retweeted_status'].notna() & (df['retweeted_status'].astype(str) != '')
+        if 'retweeted_id' in df.columns:
+            # 批量去重模式下转发微博只记录原微博ID
+            df['is_repost'] |= df['retweeted_id'].notna()
+        df['created'] = (pd.to_datetime(pd.to_numeric(df['created_timestamp'], errors='coerce'), unit='s', utc=True)
+                         .dt.tz_convert(CST).dt.tz_localize(None))
+        df['user_id'] = df['user_id'].astype('category')
+        return df.drop(columns=['created_at', 'created_timestamp', 'retweeted_status', 'retweeted_id'],
+                       errors='ignore')
+
+    def load(self, paths):
+        """加载输出目录列表，或一个合并后的数据文件（.csv/.parquet）"""
+        if isinstance(paths, str) and os.path.isfile(paths):
+            return self.load_consolidated(paths)
+
+        frames = []
+        users = {}
+        for output_dir in paths:
+            df, user_info = self._load_dir(output_dir)
+            if df is None:
+                continue
+            # 每个目录先转换类型再合并，内存峰值不随原始的字符串列增长
+            frames.append(self._compact(df))
+            if user_info.get('uid') is not None:
+                users[str(user_info['uid'])] = {
+                    'screen_name': user_info.get('screen_name'),
+                    'followers_count': parse_count(user_info.get('followers_count')),
+                }
+
+        if not frames:
+            raise ValueError("没有找到可用的微博数据文件")
+
+        posts = pd.concat(frames, ignore_index=True)
+        # 各目录的用户ID类别不同，合并后重新转为类别类型
+        posts['user_id'] = posts['user_id'].astype(str).astype('category')
+        # 多次抓取同一条微博时保留最新一次的互动数据
+        posts = posts.sort_values('scraped_at').drop_duplicates('id', keep='last').drop(columns=['scraped_at'])
+        self.posts = posts.reset_index(drop=True)
+        self.users = pd.DataFrame.from_dict(users, orient='index')
+        self.users.index.name = 'user_id'
+        return self.posts
+
+    def save_consolidated(self, filename):
+        """将已加载的数据保存为一个合并文件，后续分析可直接加载"""
+        posts = self.posts.copy()
+        posts['followers_count'] = posts['user_id'].astype(str).map(self.users['followers_count'])
+        posts['screen_name'] = posts['user_id'].astype(str).map(self.users['screen_name'])
+        if filename.endswith('.parquet'):
+            posts.to_parquet(filename, index=False)
+        else:
+            posts.to_csv(filename, index=False, encoding='utf-8-sig')
+
+    def load_consolidated(self, filename):
+        """加载 save_consolidated 保存的合并文件"""
+        if filename.endswith('.parquet'):
+            posts = pd.read_parquet(filename)
+        else:
+            posts = pd.read_csv(filename, dtype={'id': str, 'user_id': str}, parse_dates=['created'],
+                                encoding='utf-8-sig')
+        self.users = (posts[['user_id', 'screen_name', 'followers_count']].astype({'user_id': str})
+                      .drop_duplicates('user_id').set_index('user_id'))
+        posts = posts.drop(columns=['screen_name', 'followers_count'])
+        for column in COUNTER_COLUMNS:
+            posts[column] = posts[column].astype(np.uint32)
+        posts['is_repost'] = posts['is_repost'].astype(bool)
+        posts['user_id'] = posts['user_id'].astype('category')
+        self.posts = posts
+        return self.posts
+
+    def _aggregate(self, df, keys):
+        """按 keys 分组计算互动统计"""
+        df = df.assign(engagement=df[COUNTER_COLUMNS].to_numpy(dtype=np.uint64).sum(axis=1))
+        grouped = df.groupby(keys, observed=True)
+        result = grouped.agg(
+            posts=('id', 'size'),
+            first_post=('created', 'min'),
+            last_post=('created', 'max'),
+            repost_ratio=('is_repost', 'mean'),
+            engagement_mean=('engagement', 'mean'),
+        )
+        result = result.join([
+            grouped[COUNTER_COLUMNS].mean().add_suffix('_mean'),
+            grouped[COUNTER_COLUMNS].median().add_suffix('_median'),
+            grouped[COUNTER_COLUMNS].quantile(0.95).add_suffix('_p95'),
+        ])
+        result['original_ratio'] = 1 - result['repost_ratio']
+
+        followers = (result.index.get_level_values('user_id').astype(str)
+                     .map(self.users['followers_count']).to_numpy(dtype=float))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['engagement_rate'] = np.where(followers > 0, result['engagement_mean'].to_numpy() / followers,
+                                                 np.nan)
+        return result
+
+    def user_stats(self):
+        """按用户统计"""
+        result = self._aggregate(self.posts, ['user_id'])
+        days = ((result['last_post'] - result['first_post']).dt.total_seconds() / 86400).clip(lower=1)
+        result['posts_per_day'] = result['posts'] / days
+        result.insert(0, 'screen_name', result.index.astype(str).map(self.users['screen_name']))
+        return result
+
+    def period_stats(self, freq='W'):
+        """按用户和时间段（D/W/M）统计"""
+        df = self.posts[self.posts['created'].notna()]
+        df = df.assign(period=df['created'].dt.to_period(freq))
+        return self._aggregate(df, ['user_id', 'period'])
+
+    def save_report(self, freq='W', output_dir=None):
+        """计算统计结果并保存为报表"""
+        if not output_dir:
+            output_dir = f"analytics_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        os.makedirs(output_dir, exist_ok=True)
+
+        user_file = os.path.join(output_dir, 'user_stats.csv')
+        self.user_stats().to_csv(user_file, encoding='utf-8-sig', float_format='%.4f')
+
+        period_file = os.path.join(output_dir, f'period_stats_{freq}.csv')
+        self.period_stats(freq).to_csv(period_file, encoding='utf-8-sig', float_format='%.4f')
+
+        return user_file, period_file
+
+def main():
+    """主函数"""
+    print("=== 微博数据统计分析 ===")
+
+    source = input("请输入数据目录（包含 weibo_data_* 目录，默认当前目录）或合并数据文件路径: ").strip() or '.'
+    freq = input("统计周期 D/W/M (默认W): ").strip().upper() or 'W'
+    if freq not in ('D', 'W', 'M'):
+        print("无效周期")
+        return
+
+    analytics = WeiboAnalytics()
+    if os.path.isfile(source):
+        analytics.load(source)
+    else:
+        output_dirs = WeiboAnalytics.find_output_dirs(source)
+        print(f"找到 {len(output_dirs)} 个输出目录")
+        analytics.load(output_dirs)
+
+    print(f"共加载 {len(analytics.posts)} 条微博，{analytics.posts['user_id'].nunique()} 个用户")
+
+    user_file, period_file = analytics.save_report(freq)
+    print(f"用户统计已保存到: {user_file}")
+    print(f"周期统计已保存到: {period_file}")
+
+if __name__ == "__main__":
+    main()
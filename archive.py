@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始响应归档
+将接口返回的原始JSON压缩后追加写入分段文件，并记录偏移索引，
+之后可以用多进程离线重新解析，无需重新抓取
+"""
+
+import os
+import json
+import gzip
+import glob
+import time
+import logging
+import argparse
+import importlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from config import ARCHIVE_CONFIG
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SEGMENT_EXTENSIONS = {'zstd': '.zst', 'gzip': '.gz'}
+CST = timezone(timedelta(hours=8))
+
+def segment_number(path):
+    """segment-000001.zst -> 1"""
+    return int(os.path.basename(path).split('-')[1].split('.')[0])
+
+def compress(data, compression, level):
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return gzip.compress(data, compresslevel=level)
+
+def decompress(data, compression):
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("读取zstd归档需要安装 zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+class RawArchive:
+    def __init__(self, archive_dir=None, compression=None, level=None, segment_size=None):
+        self.archive_dir = archive_dir or ARCHIVE_CONFIG['archive_dir']
+        compression = compression or ARCHIVE_CONFIG['compression']
+        if compression == 'zstd' and zstandard is None:
+            compression = 'gzip'
+        self.compression = compression
+        self.level = level or ARCHIVE_CONFIG['level']
+        self.segment_size = segment_size or ARCHIVE_CONFIG['segment_size']
+        self.index_file = os.path.join(self.archive_dir, 'index.jsonl')
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        # 编号接着所有扩展名中最大的编号；最后一个分段的压缩方式相同时继续写入它，否则使用新编号
+        segments = glob.glob(os.path.join(self.archive_dir, 'segment-*'))
+        self.segment_number = max(map(segment_number, segments), default=1)
+        if segments and not os.path.exists(os.path.join(self.archive_dir, self._segment_name(self.segment_number))):
+            self.segment_number += 1
+        self.segment = None
+
+    def _segment_name(self, number):
+        return f"segment-{number:06d}{SEGMENT_EXTENSIONS[self.compression]}"
+
+    def _open_segment(self):
+        """打开当前分段，超过大小上限时切换到新分段（调用方需持有锁）"""
+        if self.segment and self.segment.tell() < self.segment_size:
+            return
+        if self.segment:
+            self.segment.close()
+            self.segment_number += 1
+        while self._number_taken(self.segment_number):
+            self.segment_number += 1
+        self.segment = open(os.path.join(self.archive_dir, self._segment_name(self.segment_number)), 'ab')
+
+    def _number_taken(self, number):
+        """该编号已写满，或已被其他压缩方式的分段使用"""
+        for compression, extension in SEGMENT_EXTENSIONS.items():
+            path = os.path.join(self.archive_dir, f"segment-{number:06d}{extension}")
+            if not os.path.exists(path):
+                continue
+            if compression != self.compression or os.path.getsize(path) >= self.segment_size:
+                return True
+        return False
+
+    def append(self, raw, uid, page, containerid):
+        """追加一页原始响应（bytes）"""
+        data = compress(raw, self.compression, self.level)
+        with self.lock:
+            self._open_segment()
+            offset = self.segment.tell()
+            self.segment.write(data)
+            self.segment.flush()
+            entry = {
+                'segment': os.path.basename(self.segment.name),
+                'offset': offset,
+                'length': len(data),
+                'compression': self.compression,
+                'uid': str(uid),
+                'page': page,
+                'containerid': containerid,
+                'time': int(time.time()),
+            }
+            with open(self.index_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+
+    def close(self):
+        with self.lock:
+            if self.segment:
+                self.segment.close()
+                self.segment = None
+
+    def entries(self):
+        """遍历索引"""
+        if not os.path.exists(self.index_file):
+            return
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def read(self, entry):
+        """读取一条归档记录，返回解析后的JSON"""
+        with open(os.path.join(self.archive_dir, entry['segment']), 'rb') as f:
+            f.seek(entry['offset'])
+            return json.loads(decompress(f.read(entry['length']), entry['compression']))
+
+# 重新解析时每个子进程各自持有一个解析函数
+_parser = None
+
+def _init_worker(parser_spec):
+    """子进程初始化：加载解析函数，默认使用 WeiboScraper.parse_weibo_data"""
+    global _parser
+    if parser_spec:
+        module_name, func_name = parser_spec.split(':')
+        func = getattr(importlib.import_module(module_name), func_name)
+        _parser = lambda mblog, scraped_at: func(mblog)
+    else:
+        from weibo_scraper import WeiboScraper
+        # 相对时间（"5分钟前"）需要按归档时的抓取时间换算
+        _parser = WeiboScraper().parse_weibo_data
+
+def _reparse_segment(archive_dir, segment, entries, output_file):
+    """解析一个分段中的所有微博列表页，结果以JSON Lines写入 output_file"""
+    count = 0
+    with open(os.path.join(archive_dir, segment), 'rb') as f, \
+            open(output_file, 'w', encoding='utf-8') as output:
+        for entry in sorted(entries, key=lambda e: e['offset']):
+            f.seek(entry['offset'])
+            data = json.loads(decompress(f.read(entry['length']), entry['compression']))
+            scraped_at = datetime.fromtimestamp(entry['time'], CST)
+            for card in data.get('data', {}).get('cards', []):
+                if card.get('card_type') == 9 and card.get('mblog'):
+                    record = _parser(card['mblog'], scraped_at)
+                    if record:
+                        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                        count += 1
+    return count
+
+def reparse(archive_dir, output_dir, parser_spec=None, workers=None, containerid_prefix='107603'):
+    """用进程池并行重新解析归档中的微博列表页，每个分段输出一个文件（分段名加 .jsonl，保留压缩扩展名）"""
+    archive = RawArchive(archive_dir)
+    by_segment = {}
+    for entry in archive.entries():
+        if str(entry.get('containerid', '')).startswith(containerid_prefix):
+            by_segment.setdefault(entry['segment'], []).append(entry)
+
+    os.makedirs(output_dir, exist_ok=True)
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(parser_spec,)) as executor:
+        futures = {}
+        for segment, entries in sorted(by_segment.items()):
+            # 同一编号可能有不同压缩方式的旧分段，保留扩展名避免输出文件互相覆盖
+            output_file = os.path.join(output_dir, segment + '.jsonl')
+            futures[executor.submit(_reparse_segment, archive_dir, segment, entries, output_file)] = segment
+        for future in as_completed(futures):
+            count = future.result()
+            total += count
+            print(f"{futures[future]}: {count} 条微博")
+    return total
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='原始响应归档工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stats_parser = subparsers.add_parser('stats', help='查看归档统计')
+    stats_parser.add_argument('--archive', default=ARCHIVE_CONFIG['archive_dir'], help='归档目录')
+
+    reparse_parser = subparsers.add_parser('reparse', help='重新解析归档')
+    reparse_parser.add_argument('--archive', default=ARCHIVE_CONFIG['archive_dir'], help='归档目录')
+    reparse_parser.add_argument('--output', required=True, help='输出目录')
+    reparse_parser.add_argument('--parser', help='自定义解析函数，格式为 模块:函数，函数接收mblog字典')
+    reparse_parser.add_argument('--workers', type=int, default=os.cpu_count(), help='进程数')
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        archive = RawArchive(args.archive)
+        entries = list(archive.entries())
+        size = sum(e['length'] for e in entries)
+        uids = {e['uid'] for e in entries}
+        print(f"归档页数: {len(entries)}")
+        print(f"用户数: {len(uids)}")
+        print(f"压缩后大小: {size / 1024 / 1024:.1f} MB")
+    elif args.command == 'reparse':
+        start = time.time()
+        total = reparse(args.archive, args.output, args.parser, args.workers)
+        print(f"重新解析完成，共 {total} 条微博，耗时 {time.time() - start:.1f} 秒")
+        print(f"结果保存在: {args.output}")
+
+if __name__ == "__main__":
+    main()
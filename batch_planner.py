@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按成本规划的批量抓取
+先并发获取所有用户的基本信息（结果缓存），根据微博总数和上次抓取后的变化估算每个用户需要的页数，
+跳过不存在、没有微博或没有新微博的用户；总请求数有上限时把页数公平分配给各用户，
+并按页数从多到少安排抓取顺序，缩短并发抓取的总耗时
+"""
+
+import os
+import json
+import math
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from config import PLANNER_CONFIG
+from batch_scraper import BatchWeiboScraper
+from proxy_pool import ProxyPool
+from identity_pool import IdentityPool
+from rate_limiter import shared_limiter
+
+def allocate_pages(demands, budget):
+    """在总页数不超过 budget 的前提下分配页数：需求少的用户得到全部所需页数，
+    其余用户平分剩余额度（max-min公平），返回 {UID: 页数}"""
+    if budget is None or sum(demands.values()) <= budget:
+        return dict(demands)
+    allocation = {}
+    remaining = budget
+    ordered = sorted(demands.items(), key=lambda item: item[1])
+    for i, (uid, demand) in enumerate(ordered):
+        pages = min(demand, remaining // (len(ordered) - i))
+        allocation[uid] = pages
+        remaining -= pages
+    return allocation
+
+class PlannedBatchScraper(BatchWeiboScraper):
+    def __init__(self, proxy_pool=None, identity_pool=None, archive=None, profiler=None, dedup=None,
+                 search_index=None, state_file=None):
+        super().__init__(proxy_pool=proxy_pool, identity_pool=identity_pool, archive=archive, profiler=profiler,
+                         dedup=dedup, search_index=search_index)
+        self.state_file = state_file or PLANNER_CONFIG['state_file']
+        self.posts_per_page = PLANNER_CONFIG['posts_per_page']
+        self.user_info_ttl = PLANNER_CONFIG['user_info_ttl']
+        # 使用代理池或身份池时由各自的速率限制控制请求间隔
+        self.limiter = None if self.scraper.page_delay == 0 else shared_limiter()
+        # UID -> {info, info_time, invalid, statuses_count, last_seen_id, last_scraped}
+        self.users = self._load_state()
+
+    def _load_state(self):
+        """加载各用户的缓存信息和上次抓取状态"""
+        if not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_state(self):
+        """保存状态"""
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.users, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def _fetch_info(self, uid):
+        """获取单个用户信息，返回 (用户信息, 失败原因)"""
+        if self.limiter:
+            self.limiter.acquire()
+        info = self.scraper.get_user_info(uid)
+        return info, None if info else self.scraper.last_failure()
+
+    def fetch_user_infos(self, user_list, workers=None):
+        """并发获取所有用户的基本信息，缓存未过期的不再请求，返回请求次数"""
+        now = time.time()
+        stale = [uid for uid in user_list
+                 if now - self.users.get(uid, {}).get('info_time', 0) > self.user_info_ttl]
+        if not stale:
+            return 0
+
+        print(f"获取 {len(stale)} 个用户的基本信息（{len(user_list) - len(stale)} 个使用缓存）")
+        with ThreadPoolExecutor(max_workers=workers or PLANNER_CONFIG['info_workers']) as executor:
+            for uid, (info, failure) in zip(stale, executor.map(self._fetch_info, stale)):
+                if not info and failure != 'api_not_ok':
+                    # 网络错误、游客验证页等不代表用户不存在，不缓存，抓取时再试
+                    continue
+                state = self.users.setdefault(uid, {})
+                state.update({'info': info, 'info_time': now, 'invalid': info is None})
+        self.save_state()
+        return len(stale)
+
+    def estimate_pages(self, uid, max_pages):
+        """估算用户需要抓取的页数，返回 (页数, 跳过原因)"""
+        state = self.users.get(uid, {})
+        if state.get('invalid'):
+            return 0, 'invalid'
+        info = state.get('info')
+        if not info:
+            # 没有拿到用户信息，按上限抓取
+            return max_pages, None
+
+        statuses_count = info.get('statuses_count') or 0
+        if not statuses_count:
+            return 0, 'empty'
+        if state.get('last_seen_id') and state.get('statuses_count') is not None:
+            new_posts = statuses_count - state['statuses_count']
+            if new_posts <= 0:
+                return 0, 'no_new'
+        else:
+            new_posts = statuses_count
+        # 置顶微博占用第一页的一个位置
+        return min(max_pages, math.ceil((new_posts + 1) / self.posts_per_page)), None
+
+    def plan(self, user_list, max_pages=5, budget=None):
+        """规划抓取任务，budget 为微博列表请求总数上限，
+        返回 ([(UID, 页数), ...] 按页数从多到少排列, {UID: 跳过原因})"""
+        user_list = list(dict.fromkeys(str(uid) for uid in user_list))
+        self.fetch_user_infos(user_list)
+
+        demands, skipped = {}, {}
+        for uid in user_list:
+            pages, reason = self.estimate_pages(uid, max_pages)
+            if reason:
+                skipped[uid] = reason
+            else:
+                demands[uid] = pages
+
+        allocation = allocate_pages(demands, budget)
+        for uid, pages in allocation.items():
+            if pages <= 0:
+                skipped[uid] = 'budget'
+        # 最长任务优先：并发抓取时大用户先开始，避免最后只剩一个大用户在跑
+        tasks = sorted(((uid, pages) for uid, pages in allocation.items() if pages > 0),
+                       key=lambda task: task[1], reverse=True)
+
+        planned = sum(pages for _, pages in tasks)
+        print(f"计划抓取 {len(tasks)} 个用户，共约 {planned} 次列表请求"
+              f"（不做规划需要 {len(user_list) * max_pages} 次），跳过 {len(skipped)} 个用户")
+        for reason, label in (('invalid', '用户不存在'), ('empty', '没有微博'), ('no_new', '没有新微博'),
+                              ('budget', '超出请求预算')):
+            count = sum(1 for r in skipped.values() if r == reason)
+            if count:
+                print(f"  {label}: {count} 个")
+        return tasks, skipped
+
+    def _run_task(self, uid, pages):
+        state = self.users.get(uid, {})
+        record = self.scrape_one_user(uid, pages, since_id=state.get('last_seen_id'), user_info=state.get('info'))
+        record['planned_pages'] = pages
+        return record
+
+    def _update_state(self, uid, record):
+        """抓取成功后记录最新微博ID和当时的微博总数，下次只估算新增部分"""
+        if not record['success']:
+            return
+        state = self.users.setdefault(uid, {})
+        info = record['user_info']
+        state.update({'info': info, 'info_time': state.get('info_time') or time.time(), 'invalid': False,
+                      'statuses_count': info.get('statuses_count'), 'last_scraped': datetime.now().isoformat()})
+        if record.get('latest_id') and int(record['latest_id']) > int(state.get('last_seen_id') or 0):
+            state['last_seen_id'] = record['latest_id']
+
+    def run(self, user_list, max_pages=5, budget=None, delay=10, workers=1):
+        """规划并执行抓取，返回 {UID: 结果记录}，跳过的用户也有记录"""
+        tasks, skipped = self.plan(user_list, max_pages, budget)
+        results = {}
+        if workers > 1:
+            print(f"使用 {workers} 个线程并发抓取")
+            with self.shared_pacing(workers), ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {uid: executor.submit(self._run_task, uid, pages) for uid, pages in tasks}
+                for uid, future in futures.items():
+                    results[uid] = future.result()
+        else:
+            for i, (uid, pages) in enumerate(tasks, 1):
+                print(f"\n正在处理第 {i}/{len(tasks)} 个用户: {uid}（{pages} 页）")
+                results[uid] = self._run_task(uid, pages)
+                if i < len(tasks):
+                    print(f"等待 {delay} 秒后继续...")
+                    with self.profiler.phase('user_delay'):
+                        time.sleep(delay)
+
+        for uid, record in results.items():
+            self._update_state(uid, record)
+        self.save_state()
+
+        for uid, reason in skipped.items():
+            record = {'success': reason == 'no_new', 'skipped': reason, 'scrape_time': datetime.now().isoformat()}
+            if reason == 'no_new':
+                record.update({'user_info': self.users[uid]['info'], 'weibo_count': 0, 'output_dir': None})
+            else:
+                record['error'] = f'Skipped: {reason}'
+            results[uid] = record
+        return {uid: results[uid] for uid in dict.fromkeys(str(uid) for uid in user_list)}
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='微博批量抓取（按用户微博数规划请求）')
+    parser.add_argument('user_list', help='用户列表文件（每行一个UID，或JSON列表）')
+    parser.add_argument('--pages', type=int, default=5, help='每个用户最多抓取页数')
+    parser.add_argument('--budget', type=int, help='微博列表请求总数上限')
+    parser.add_argument('--delay', type=int, default=10, help='单线程抓取时用户间延时秒数')
+    parser.add_argument('--workers', type=int, default=1, help='并发线程数')
+    parser.add_argument('--state-file', default=PLANNER_CONFIG['state_file'], help='用户信息缓存和抓取状态文件')
+    parser.add_argument('--refresh-info', action='store_true', help='忽略缓存，重新获取所有用户信息')
+    parser.add_argument('--dry-run', action='store_true', help='只输出抓取计划，不抓取')
+    args = parser.parse_args()
+
+    user_list = BatchWeiboScraper.load_user_list(args.user_list)
+    if not user_list:
+        print("用户列表为空")
+        return
+
+    proxy_pool = ProxyPool.from_config()
+    identity_pool = IdentityPool(size=args.workers, proxy_pool=proxy_pool) if args.workers > 1 else None
+    planner = PlannedBatchScraper(proxy_pool=proxy_pool, identity_pool=identity_pool, state_file=args.state_file)
+    if args.refresh_info:
+        planner.user_info_ttl = 0
+    if args.dry_run:
+        tasks, skipped = planner.plan(user_list, args.pages, args.budget)
+        for uid, pages in tasks:
+            print(f"{uid}: {pages} 页")
+        return
+
+    results = planner.run(user_list, args.pages, args.budget, args.delay, args.workers)
+    planner.save_batch_results(results)
+
+if __name__ == "__main__":
+    main()
@@ -7,66 +7,120 @@
 import json
 import time
 import os
+import argparse
 from datetime import datetime
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from weibo_scraper import WeiboScraper
+from proxy_pool import ProxyPool
+from identity_pool import IdentityPool
+from archive import RawArchive
+from dedup_store import DedupStore
+from search_index import SearchIndex
+from profiler import NullProfiler, create_profiler
+from rate_limiter import shared_limiter
+from config import ARCHIVE_CONFIG, SEARCH_INDEX_CONFIG
 
 class BatchWeiboScraper:
-    def __init__(self):
-        self.scraper = WeiboScraper()
+    def __init__(self, proxy_pool=None, identity_pool=None, archive=None, profiler=None, dedup=None,
+                 search_index=None):
+        self.proxy_pool = proxy_pool
+        self.identity_pool = identity_pool
+        self.profiler = profiler or NullProfiler()
+        self.dedup = dedup
+        self.scraper = WeiboScraper(proxy_pool=proxy_pool, identity_pool=identity_pool, archive=archive,
+                                    profiler=self.profiler, dedup=dedup, search_index=search_index)
         
-    def load_user_list(self, file_path):
+    @contextmanager
+    def shared_pacing(self, workers):
+        """并发抓取期间，没有代理池和身份池时各线程的请求共用进程内的限速器，代替单线程时的用户间延时"""
+        if self.scraper.page_delay == 0:
+            yield
+            return
+        limiter = shared_limiter()
+        print(f"未配置代理池，{workers} 个线程共用限速器（每秒 {limiter.rate:g} 次请求），不使用用户间延时")
+        self.scraper.limiter = limiter
+        try:
+            yield
+        finally:
+            self.scraper.limiter = None
+
+    @staticmethod
+    def load_user_list(file_path):
         """从文件加载用户列表"""
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 if file_path.endswith('.json'):
                     return json.load(f)
                 else:
-                    # 假设是文本文件，每行一个UID
-                    return [line.strip() for line in f if line.strip()]
+                    # 假设是文本文件，每行一个UID，#开头的行为注释
+                    return [line.strip() for line in f if line.strip() and not line.startswith('#')]
         except Exception as e:
             print(f"加载用户列表失败: {e}")
             return []
     
-    def scrape_multiple_users(self, user_list, max_pages=5, delay=10):
-        """批量抓取多个用户"""
-        results = {}
+    def scrape_one_user(self, uid, max_pages=5, since_id=None, user_info=None):
+        """抓取单个用户，返回结果记录"""
+        try:
+            result = self.scraper.scrape_user_weibos(uid, max_pages=max_pages, since_id=since_id,
+                                                     user_info=user_info)
+            
+            if result:
+                print(f"✅ 成功抓取用户 {result['user_info']['screen_name']}")
+                return {
+                    'success': True,
+                    'user_info': result['user_info'],
+                    'weibo_count': len(result['weibos']),
+                    'latest_id': max((str(w['id']) for w in result['weibos'] if w.get('id')), key=int, default=None),
+                    'output_dir': result['output_dir'],
+                    'scrape_time': datetime.now().isoformat()
+                }
+            else:
+                print(f"❌ 抓取用户 {uid} 失败")
+                return {
+                    'success': False,
+                    'error': 'Failed to scrape',
+                    'failure': self.scraper.last_failure(),
+                    'scrape_time': datetime.now().isoformat()
+                }
+            
+        except Exception as e:
+            print(f"❌ 抓取用户 {uid} 出现异常: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'scrape_time': datetime.now().isoformat()
+            }
+    
+    def scrape_multiple_users(self, user_list, max_pages=5, delay=10, workers=1):
+        """批量抓取多个用户，workers>1 时并发抓取（建议配合代理池使用）"""
         total_users = len(user_list)
         
+        if workers > 1:
+            print(f"使用 {workers} 个线程并发抓取")
+            with self.shared_pacing(workers), ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {uid: executor.submit(self.scrape_one_user, uid, max_pages) for uid in user_list}
+                results = {uid: future.result() for uid, future in futures.items()}
+            if self.proxy_pool:
+                for stat in self.proxy_pool.stats():
+                    print(f"代理 {stat['url']}: 请求 {stat['requests']} 次, 失败 {stat['failures']} 次, "
+                          f"限流 {stat['throttles']} 次, 平均延迟 {stat['latency']} 秒")
+            if self.identity_pool:
+                for stat in self.identity_pool.stats():
+                    print(f"身份 #{stat['index']}: 请求 {stat['requests']} 次, 限流 {stat['throttles']} 次")
+            return results
+        
+        results = {}
         for i, uid in enumerate(user_list, 1):
             print(f"\n正在处理第 {i}/{total_users} 个用户: {uid}")
             
-            try:
-                result = self.scraper.scrape_user_weibos(uid, max_pages=max_pages)
-                
-                if result:
-                    results[uid] = {
-                        'success': True,
-                        'user_info': result['user_info'],
-                        'weibo_count': len(result['weibos']),
-                        'output_dir': result['output_dir'],
-                        'scrape_time': datetime.now().isoformat()
-                    }
-                    print(f"✅ 成功抓取用户 {result['user_info']['screen_name']}")
-                else:
-                    results[uid] = {
-                        'success': False,
-                        'error': 'Failed to scrape',
-                        'scrape_time': datetime.now().isoformat()
-                    }
-                    print(f"❌ 抓取用户 {uid} 失败")
-                
-            except Exception as e:
-                results[uid] = {
-                    'success': False,
-                    'error': str(e),
-                    'scrape_time': datetime.now().isoformat()
-                }
-                print(f"❌ 抓取用户 {uid} 出现异常: {e}")
+            results[uid] = self.scrape_one_user(uid, max_pages)
             
             # 添加延时避免被封
             if i < total_users:
                 print(f"等待 {delay} 秒后继续...")
-                time.sleep(delay)
+                with self.profiler.phase('user_delay'):
+                    time.sleep(delay)
         
         return results
     
@@ -95,6 +149,12 @@ class BatchWeiboScraper:
 详细结果已保存到: {results_file}
 """
         
+        if self.dedup:
+            originals_file = f'batch_originals_{timestamp}.jsonl'
+            count = self.dedup.export_originals(originals_file)
+            report += (f"跳过已抓取过的微博: {self.dedup.skipped} 条\n"
+                       f"新缓存被转发的原微博: {count} 条（已保存到 {originals_file}），重复引用 {self.dedup.original_hits} 次\n")
+        
         print(report)
         
         # 保存报告
@@ -112,6 +172,10 @@ class BatchWeiboScraper:
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='微博批量抓取工具')
+    parser.add_argument('--profile', action='store_true', help='输出各阶段耗时、cProfile热点和内存峰值')
+    args = parser.parse_args()
+    
     print("=== 微博批量抓取工具 ===")
     
     # 获取用户输入
@@ -150,20 +214,41 @@ def main():
     
     print(f"共 {len(user_list)} 个用户待抓取")
     
+    proxy_pool = ProxyPool.from_config()
+    if proxy_pool:
+        print(f"已加载 {len(proxy_pool.proxies)} 个代理")
+    
     # 获取抓取参数
     try:
         max_pages = int(input("每个用户抓取页数 (默认5): ").strip() or "5")
         delay = int(input("用户间延时秒数 (默认10): ").strip() or "10")
+        workers = int(input("并发线程数 (默认1): ").strip() or "1")
     except ValueError:
         max_pages = 5
         delay = 10
+        workers = 1
+    
+    # 并发抓取时每个线程使用独立的身份，避免共用一个身份的请求额度
+    identity_pool = IdentityPool(size=workers, proxy_pool=proxy_pool) if workers > 1 else None
+    
+    # 跨用户、跨运行去重，被转发的原微博只保存一次
+    # 开启后输出格式有变化（跳过已抓取过的微博，转发微博的原文另存），默认关闭
+    use_dedup = input("是否跳过以前抓取过的微博并共享转发原文？(y/n, 默认n): ").strip().lower() == 'y'
+    dedup = DedupStore() if use_dedup else None
     
     # 开始批量抓取
-    batch_scraper = BatchWeiboScraper()
-    results = batch_scraper.scrape_multiple_users(user_list, max_pages, delay)
+    archive = RawArchive() if ARCHIVE_CONFIG['enabled'] else None
+    search_index = SearchIndex() if SEARCH_INDEX_CONFIG['enabled'] else None
+    profiler = create_profiler(args.profile)
+    batch_scraper = BatchWeiboScraper(proxy_pool=proxy_pool, identity_pool=identity_pool, archive=archive,
+                                      profiler=profiler, dedup=dedup, search_index=search_index)
+    profiler.start()
+    results = batch_scraper.scrape_multiple_users(user_list, max_pages, delay, workers)
+    profiler.stop()
     
     # 保存结果
-    batch_scraper.save_batch_results(results)
+    results_file, report_file = batch_scraper.save_batch_results(results)
+    profiler.save(os.path.splitext(results_file)[0] + '_profile')
 
 if __name__ == "__main__":
     main()
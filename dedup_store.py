@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量抓取去重存储
+记录已抓取过的微博ID（内存中的布隆过滤器 + SQLite精确记录），
+并共享缓存被转发的原微博，同一条原微博只保存一次
+"""
+
+import math
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from config import DEDUP_CONFIG
+
+class BloomFilter:
+    """固定大小的布隆过滤器，可能误判为已存在，不会漏判"""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+class DedupStore:
+    def __init__(self, db_file=None, capacity=None, error_rate=None):
+        self.db_file = db_file or DEDUP_CONFIG['db_file']
+        self.bloom = BloomFilter(capacity or DEDUP_CONFIG['capacity'], error_rate or DEDUP_CONFIG['error_rate'])
+        self.lock = threading.Lock()
+        self.run_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        self.skipped = 0
+        self.original_hits = 0
+
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS originals (id TEXT PRIMARY KEY, run_id TEXT, data TEXT)')
+        self.conn.commit()
+
+        # 以前运行中抓取过的ID和原微博都放入过滤器，大部分新ID不需要查询数据库
+        for table in ('seen', 'originals'):
+            for (mblog_id,) in self.conn.execute(f'SELECT id FROM {table}'):
+                self.bloom.add(f'{table}:{mblog_id}')
+
+    def _exists(self, table, mblog_id):
+        """查询ID是否存在（调用方需持有锁）"""
+        if f'{table}:{mblog_id}' not in self.bloom:
+            return False
+        return self.conn.execute(f'SELECT 1 FROM {table} WHERE id = ?', (mblog_id,)).fetchone() is not None
+
+    def is_seen(self, mblog_id):
+        """微博是否在本次或以前的批量抓取中保存过"""
+        with self.lock:
+            seen = self._exists('seen', str(mblog_id))
+            if seen:
+                self.skipped += 1
+            return seen
+
+    def mark_seen(self, mblog_ids):
+        """记录已保存的微博ID，应在写出数据后调用"""
+        mblog_ids = [str(mblog_id) for mblog_id in mblog_ids if mblog_id is not None]
+        with self.lock:
+            self.conn.executemany('INSERT OR IGNORE INTO seen (id) VALUES (?)', [(i,) for i in mblog_ids])
+            self.conn.commit()
+            for mblog_id in mblog_ids:
+                self.bloom.add(f'seen:{mblog_id}')
+
+    def has_original(self, mblog_id):
+        """原微博是否已缓存"""
+        with self.lock:
+            cached = self._exists('originals', str(mblog_id))
+            if cached:
+                self.original_hits += 1
+            return cached
+
+    def add_original(self, weibo):
+        """缓存被转发的原微博，已存在时不覆盖"""
+        mblog_id = str(weibo['id'])
+        with self.lock:
+            self.conn.execute('INSERT OR IGNORE INTO originals (id, run_id, data) VALUES (?, ?, ?)',
+                              (mblog_id, self.run_id, json.dumps(weibo, ensure_ascii=False)))
+            self.conn.commit()
+            self.bloom.add(f'originals:{mblog_id}')
+
+    def get_original(self, mblog_id):
+        """按ID读取缓存的原微博"""
+        with self.lock:
+            row = self.conn.execute('SELECT data FROM originals WHERE id = ?', (str(mblog_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def export_originals(self, filename):
+        """将本次运行新缓存的原微博写入JSON行文件，返回条数"""
+        with self.lock:
+            rows = self.conn.execute('SELECT data FROM originals WHERE run_id = ?', (self.run_id,)).fetchall()
+        with open(filename, 'w', encoding='utf-8') as f:
+            for (data,) in rows:
+                f.write(data + '\n')
+        return len(rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
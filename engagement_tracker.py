@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+微博互动数据追踪
+定期重新获取近期微博的点赞、转发、评论数，只保存变化量，
+越新的微博轮询越频繁，数据无变化时逐步降低轮询频率
+"""
+
+import os
+import csv
+import json
+import time
+import math
+import heapq
+import logging
+from datetime import datetime
+from config import TRACKING_CONFIG
+from weibo_scraper import WeiboScraper, CST
+from proxy_pool import ProxyPool
+from analytics import parse_count
+
+COUNTERS = ('attitudes_count', 'reposts_count', 'comments_count')
+SERIES_HEADER = ['mblog_id', 'timestamp', 'd_attitudes', 'd_reposts', 'd_comments']
+
+def read_counts(mblog):
+    """读取互动数，"100万+"这样的字符串按万/亿换算，无法解析的记为0"""
+    counts = [parse_count(mblog.get(c)) for c in COUNTERS]
+    return [0 if math.isnan(count) else int(count) for count in counts]
+
+class EngagementTracker:
+    def __init__(self, scraper=None, state_file=None, series_file=None):
+        self.scraper = scraper or WeiboScraper()
+        self.state_file = state_file or TRACKING_CONFIG['state_file']
+        self.series_file = series_file or TRACKING_CONFIG['series_file']
+        self.max_age = TRACKING_CONFIG['max_age_hours'] * 3600
+        self.min_interval = TRACKING_CONFIG['min_interval']
+        self.max_interval = TRACKING_CONFIG['max_interval']
+        self.age_factor = TRACKING_CONFIG['age_factor']
+        self.backoff = TRACKING_CONFIG['backoff']
+        self.logger = logging.getLogger(__name__)
+
+        # 微博ID -> {created, counts, unchanged, next_poll}
+        self.posts = {}
+        self.queue = []
+        self._load_state()
+
+    def _load_state(self):
+        """加载追踪状态并重建轮询队列"""
+        if not os.path.exists(self.state_file):
+            return
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            self.posts = json.load(f)
+        self.queue = [(post['next_poll'], mblog_id) for mblog_id, post in self.posts.items()]
+        heapq.heapify(self.queue)
+        self.logger.info(f"已恢复 {len(self.posts)} 条微博的追踪状态")
+
+    def save_state(self):
+        """保存追踪状态"""
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.posts, f)
+        os.replace(tmp_file, self.state_file)
+
+    def _interval(self, post, now):
+        """轮询间隔：随微博发布时长增长，连续无变化时按倍数放大"""
+        age = max(0, now - post['created'])
+        interval = max(self.min_interval, age * self.age_factor) * self.backoff ** post['unchanged']
+        return min(interval, self.max_interval)
+
+    def _write_deltas(self, rows):
+        """追加变化量记录"""
+        new_file = not os.path.exists(self.series_file)
+        with open(self.series_file, 'a', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(SERIES_HEADER)
+            writer.writerows(rows)
+
+    def track(self, weibos):
+        """加入需要追踪的微博（parse_weibo_data 的输出），首次加入时记录基准值"""
+        now = time.time()
+        rows = []
+        for weibo in weibos:
+            mblog_id = str(weibo.get('id'))
+            created = weibo.get('created_timestamp')
+            if mblog_id in self.posts or not created or now - created > self.max_age:
+                continue
+            counts = read_counts(weibo)
+            post = {'created': created, 'counts': counts, 'unchanged': 0}
+            post['next_poll'] = now + self._interval(post, now)
+            self.posts[mblog_id] = post
+            heapq.heappush(self.queue, (post['next_poll'], mblog_id))
+            # 基准值作为相对于0的变化量保存，累加即可还原任意时刻的数值
+            rows.append([mblog_id, int(now)] + counts)
+        if rows:
+            self._write_deltas(rows)
+            self.logger.info(f"新增追踪 {len(rows)} 条微博")
+        return len(rows)
+
+    def track_user(self, uid, max_pages=5):
+        """抓取用户近期发布的微博并加入追踪"""
+        since = time.time() - self.max_age
+        weibos = self.scraper.get_user_weibo_list(uid, max_pages, since=since)
+        return self.track(weibos)
+
+    def fetch_counts(self, mblog_id):
+        """获取单条微博当前的互动数，微博已删除或不可见时返回None"""
+        response = self.scraper.fetch('https://m.weibo.cn/statuses/show', {'id': mblog_id})
+        response.raise_for_status()
+        data = response.json()
+        if data.get('ok') != 1:
+            return None
+        mblog = data.get('data', {})
+        return read_counts(mblog)
+
+    def poll_once(self, mblog_id, now):
+        """轮询一条微博，返回是否继续追踪"""
+        post = self.posts[mblog_id]
+        if now - post['created'] > self.max_age:
+            return False
+
+        try:
+            counts = self.fetch_counts(mblog_id)
+        except Exception as e:
+            # 请求失败不代表数据没有变化，保持当前轮询间隔
+            self.logger.warning(f"获取微博 {mblog_id} 互动数失败: {e}")
+            return True
+        if counts is None:
+            self.logger.info(f"微博 {mblog_id} 已不可见，停止追踪")
+            return False
+
+        deltas = [new - old for new, old in zip(counts, post['counts'])]
+        if any(deltas):
+            self._write_deltas([[mblog_id, int(now)] + deltas])
+            post['counts'] = counts
+            post['unchanged'] = 0
+        else:
+            post['unchanged'] += 1
+        return True
+
+    def run(self, duration=None, save_interval=60):
+        """按轮询队列持续追踪，duration 为运行秒数（None 表示直到没有需要追踪的微博）"""
+        end_time = time.time() + duration if duration else None
+        last_save = time.time()
+
+        while self.queue:
+            next_poll, mblog_id = self.queue[0]
+            now = time.time()
+            if end_time and next_poll >= end_time:
+                break
+            if next_poll > now:
+                time.sleep(min(next_poll - now, save_interval))
+                continue
+
+            heapq.heappop(self.queue)
+            post = self.posts.get(mblog_id)
+            if not post or post['next_poll'] != next_poll:
+                continue  # 队列中的过期条目
+
+            if self.poll_once(mblog_id, now):
+                post['next_poll'] = now + self._interval(post, now)
+                heapq.heappush(self.queue, (post['next_poll'], mblog_id))
+            else:
+                del self.posts[mblog_id]
+
+            if now - last_save >= save_interval:
+                self.save_state()
+                last_save = now
+
+        self.save_state()
+
+def main():
+    """主函数"""
+    print("=== 微博互动数据追踪 ===")
+    uids = input("请输入要追踪的用户UID（多个用逗号分隔，留空则继续上次的追踪）: ").strip()
+    try:
+        hours = float(input("运行时长（小时，留空则直到所有微博超出追踪范围）: ").strip() or "0")
+    except ValueError:
+        hours = 0
+
+    tracker = EngagementTracker(scraper=WeiboScraper(proxy_pool=ProxyPool.from_config()))
+    for uid in [u.strip() for u in uids.split(',') if u.strip()]:
+        count = tracker.track_user(uid)
+        print(f"用户 {uid}: 新增追踪 {count} 条微博")
+
+    print(f"共追踪 {len(tracker.posts)} 条微博，开始时间 {datetime.now(CST).strftime('%Y-%m-%d %H:%M:%S')}")
+    try:
+        tracker.run(duration=hours * 3600 if hours > 0 else None)
+    except KeyboardInterrupt:
+        tracker.save_state()
+        print("\n用户中断操作，追踪状态已保存")
+
+    print(f"变化量记录保存在: {tracker.series_file}")
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,25 @@
 import requests
 import re
 import json
-from urllib.parse import urlparse, parse_qs
+import os
+import time
+import threading
+from urllib.parse import urlparse, parse_qs, quote
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import UID_CACHE_CONFIG, SEARCH_CONFIG, USER_AGENTS
+from rate_limiter import shared_limiter
+from proxy_pool import ProxyPool
+
+# 页面中的UID只需一次扫描即可匹配两种写法
+UID_PATTERN = re.compile(r'"oid":"(\d+)"|CONFIG\[\'oid\'\]=\'(\d+)\'')
+UID_URL_PATTERN = re.compile(r'/u/(\d+)')
+
+def extract_uid_from_html(html):
+    """从用户主页HTML中提取UID"""
+    match = UID_PATTERN.search(html)
+    if match:
+        return match.group(1) or match.group(2)
+    return None
 
 def get_uid_from_url(weibo_url):
     """从微博链接中提取UID"""
@@ -31,30 +49,12 @@ def get_uid_from_url(weibo_url):
         print(f"解析链接失败: {e}")
         return None
 
-def get_uid_from_username_url(weibo_url):
+def get_uid_from_username_url(weibo_url, session=None):
     """从用户名链接获取UID"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(weibo_url, headers=headers, allow_redirects=True)
-        
-        # 查找UID
-        uid_pattern = r'"oid":"(\d+)"'
-        match = re.search(uid_pattern, response.text)
-        if match:
-            return match.group(1)
-        
-        # 尝试其他模式
-        uid_pattern2 = r'CONFIG\[\'oid\'\]=\'(\d+)\''
-        match2 = re.search(uid_pattern2, response.text)
-        if match2:
-            return match2.group(1)
-            
-        # 从重定向URL中获取
-        if '/u/' in response.url:
-            return get_uid_from_url(response.url)
+        uid = resolve_username_url(weibo_url, session)
+        if uid:
+            return uid
             
         print("无法从页面中提取UID")
         return None
@@ -63,57 +63,275 @@ def get_uid_from_username_url(weibo_url):
         print(f"请求失败: {e}")
         return None
 
+def resolve_username_url(weibo_url, session=None):
+    """请求用户名链接并解析UID，网络错误时抛出异常，页面中没有UID时返回None"""
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+    
+    response = (session or requests).get(weibo_url, headers=headers, allow_redirects=True, timeout=10)
+    
+    # 重定向后的URL中已包含UID时无需扫描页面
+    match = UID_URL_PATTERN.search(urlparse(response.url).path)
+    if match:
+        return match.group(1)
+    
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return extract_uid_from_html(response.text)
+
+def parse_user_cards(cards):
+    """从搜索结果卡片中提取用户信息"""
+    users = []
+    for card in cards:
+        # 用户卡片(card_type=10)通常嵌套在 card_group 中
+        for item in card.get('card_group') or [card]:
+            if item.get('card_type') == 10 and item.get('user'):
+                user = item['user']
+                users.append({
+                    'uid': user.get('id'),
+                    'screen_name': user.get('screen_name'),
+                    'description': user.get('description', ''),
+                    'followers_count': user.get('followers_count', 0),
+                    'verified': user.get('verified', False)
+                })
+    return users
+
+def fetch_user_search_page(keyword, page=1, session=None):
+    """请求一页用户搜索结果，请求失败时抛出异常"""
+    search_url = "https://m.weibo.cn/api/container/getIndex"
+    params = {
+        'containerid': f'100103type=1&q={keyword}',
+        'page_type': 'searchall',
+        'page': page
+    }
+    
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Referer': 'https://m.weibo.cn'
+    }
+    
+    response = (session or requests).get(search_url, params=params, headers=headers, timeout=10)
+    response.raise_for_status()
+    data = response.json()
+    
+    if data.get('ok') != 1:
+        # 超出最后一页时接口同样返回 ok=0
+        return []
+    return parse_user_cards(data.get('data', {}).get('cards', []))
+
 def search_user_by_keyword(keyword):
     """通过关键词搜索用户"""
     try:
-        search_url = f"https://m.weibo.cn/api/container/getIndex"
-        params = {
-            'containerid': f'100103type=1&q={keyword}',
-            'page_type': 'searchall'
-        }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Referer': 'https://m.weibo.cn'
-        }
-        
-        response = requests.get(search_url, params=params, headers=headers)
-        data = response.json()
-        
-        if data.get('ok') == 1:
-            cards = data.get('data', {}).get('cards', [])
-            users = []
-            
-            for card in cards:
-                if card.get('card_type') == 10:  # 用户卡片
-                    card_group = card.get('card_group', [])
-                    for group in card_group:
-                        if group.get('card_type') == 10:
-                            user = group.get('user', {})
-                            users.append({
-                                'uid': user.get('id'),
-                                'screen_name': user.get('screen_name'),
-                                'description': user.get('description', ''),
-                                'followers_count': user.get('followers_count', 0),
-                                'verified': user.get('verified', False)
-                            })
-            
-            return users
-        else:
-            print("搜索失败")
-            return []
-            
+        return fetch_user_search_page(keyword)
     except Exception as e:
         print(f"搜索用户失败: {e}")
         return []
 
+class UidCache:
+    """用户名/链接 -> UID 的持久化缓存，解析失败的结果也会缓存但有效期更短"""
+    
+    def __init__(self, cache_file=None, ttl=None, negative_ttl=None):
+        self.cache_file = cache_file or UID_CACHE_CONFIG['cache_file']
+        self.ttl = ttl or UID_CACHE_CONFIG['ttl']
+        self.negative_ttl = negative_ttl or UID_CACHE_CONFIG['negative_ttl']
+        self.lock = threading.Lock()
+        self.entries = self._load()
+    
+    def _load(self):
+        """加载缓存文件"""
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"加载UID缓存失败，将重新建立: {e}")
+            return {}
+    
+    def get(self, key):
+        """查询缓存，返回 (是否命中, UID)，UID为None表示已知无法解析"""
+        with self.lock:
+            entry = self.entries.get(key)
+        if not entry:
+            return False, None
+        ttl = self.ttl if entry['uid'] else self.negative_ttl
+        if time.time() - entry['time'] > ttl:
+            return False, None
+        return True, entry['uid']
+    
+    def set(self, key, uid):
+        """写入缓存"""
+        with self.lock:
+            self.entries[key] = {'uid': uid, 'time': time.time()}
+    
+    def save(self):
+        """保存缓存（先写临时文件再替换，避免中断时损坏）"""
+        tmp_file = self.cache_file + '.tmp'
+        with self.lock:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_file, self.cache_file)
+
+class BulkUidResolver:
+    """批量并发解析用户链接或用户名为UID"""
+    
+    def __init__(self, cache=None, max_workers=None, limiter=None, proxy_pool=None):
+        self.cache = cache or UidCache()
+        self.max_workers = max_workers or UID_CACHE_CONFIG['max_workers']
+        # 使用代理池时由每个代理自己的速率限制控制
+        self.limiter = limiter or (None if proxy_pool else shared_limiter())
+        self.session = proxy_pool.session() if proxy_pool else requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENTS[0]})
+    
+    def normalize(self, item):
+        """统一输入格式作为缓存键"""
+        item = item.strip()
+        if 'weibo.com' in item or 'weibo.cn' in item:
+            if not item.startswith('http'):
+                item = 'https://' + item
+            return item.split('?')[0].rstrip('/')
+        return item.lstrip('@')
+    
+    def resolve_one(self, item):
+        """解析单个条目，网络错误时抛出异常（不写入缓存）"""
+        if item.isdigit():
+            return item
+        
+        if 'weibo.com' in item or 'weibo.cn' in item:
+            match = UID_URL_PATTERN.search(urlparse(item).path)
+            if match:
+                return match.group(1)
+            url = item
+        else:
+            # 用户名通过 /n/ 链接跳转到用户主页
+            url = f"https://m.weibo.cn/n/{quote(item)}"
+        
+        if self.limiter:
+            self.limiter.acquire()
+        return resolve_username_url(url, self.session)
+    
+    def _resolve_cached(self, key):
+        """先查缓存，未命中时请求并写入缓存"""
+        if key.isdigit() or UID_URL_PATTERN.search(key):
+            # 不需要请求网络的条目不进缓存
+            return self.resolve_one(key)
+        hit, uid = self.cache.get(key)
+        if hit:
+            return uid
+        uid = self.resolve_one(key)
+        self.cache.set(key, uid)
+        return uid
+    
+    def resolve(self, items):
+        """批量解析，返回 {输入: UID或None}"""
+        keys = {}
+        for item in items:
+            item = item.strip()
+            if item and not item.startswith('#'):
+                keys[item] = self.normalize(item)
+        unique_keys = list(dict.fromkeys(keys.values()))
+        print(f"共 {len(keys)} 个条目，去重后 {len(unique_keys)} 个待解析")
+        
+        resolved = {}
+        errors = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._resolve_cached, key): key for key in unique_keys}
+            for done, future in enumerate(as_completed(futures), 1):
+                key = futures[future]
+                try:
+                    resolved[key] = future.result()
+                except Exception as e:
+                    resolved[key] = None
+                    errors += 1
+                    print(f"解析 {key} 失败: {e}")
+                
+                if done % UID_CACHE_CONFIG['save_interval'] == 0:
+                    self.cache.save()
+                    print(f"已解析 {done}/{len(unique_keys)}")
+        
+        self.cache.save()
+        
+        results = {item: resolved.get(key) for item, key in keys.items()}
+        success = sum(1 for uid in results.values() if uid)
+        print(f"解析完成，成功 {success} 个，失败 {len(results) - success} 个（其中网络错误 {errors} 个）")
+        return results
+    
+    def save_uid_list(self, results, filename):
+        """保存为每行一个UID的文本文件，可直接用于 BatchWeiboScraper.load_user_list"""
+        uids = list(dict.fromkeys(uid for uid in results.values() if uid))
+        with open(filename, 'w', encoding='utf-8') as f:
+            for uid in uids:
+                f.write(f"{uid}\n")
+        
+        # 同时保存完整的对应关系，方便排查解析失败的条目
+        mapping_file = os.path.splitext(filename)[0] + '_mapping.json'
+        with open(mapping_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        
+        return filename, mapping_file
+
+class UserSearchEngine:
+    """多关键词并发翻页搜索用户，按UID去重后逐条写入文件"""
+    
+    def __init__(self, max_pages=None, max_workers=None, limiter=None, proxy_pool=None):
+        self.max_pages = max_pages or SEARCH_CONFIG['max_pages']
+        self.max_workers = max_workers or SEARCH_CONFIG['max_workers']
+        self.limiter = limiter or (None if proxy_pool else shared_limiter())
+        self.session = proxy_pool.session() if proxy_pool else requests.Session()
+        self.seen_uids = set()
+        self.lock = threading.Lock()
+    
+    def _search_keyword(self, keyword, output):
+        """翻页搜索单个关键词，返回新发现的用户数"""
+        found = 0
+        for page in range(1, self.max_pages + 1):
+            if self.limiter:
+                self.limiter.acquire()
+            users = fetch_user_search_page(keyword, page, self.session)
+            if not users:
+                break
+            
+            with self.lock:
+                for user in users:
+                    if user['uid'] is None or user['uid'] in self.seen_uids:
+                        continue
+                    self.seen_uids.add(user['uid'])
+                    user['keyword'] = keyword
+                    output.write(json.dumps(user, ensure_ascii=False) + '\n')
+                    found += 1
+                output.flush()
+        return found
+    
+    def search(self, keywords, output_file):
+        """搜索所有关键词，结果以JSON Lines格式写入 output_file，返回去重后的用户数"""
+        keywords = list(dict.fromkeys(k.strip() for k in keywords if k.strip()))
+        print(f"共 {len(keywords)} 个关键词，每个最多 {self.max_pages} 页")
+        
+        with open(output_file, 'w', encoding='utf-8') as output:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(self._search_keyword, k, output): k for k in keywords}
+                for done, future in enumerate(as_completed(futures), 1):
+                    keyword = futures[future]
+                    try:
+                        found = future.result()
+                        print(f"[{done}/{len(keywords)}] {keyword}: 新增 {found} 个用户")
+                    except Exception as e:
+                        print(f"[{done}/{len(keywords)}] {keyword}: 搜索失败: {e}")
+        
+        print(f"搜索完成，共 {len(self.seen_uids)} 个不重复用户，已保存到 {output_file}")
+        return len(self.seen_uids)
+
 def main():
     """主函数"""
     print("=== 微博用户UID获取工具 ===")
     print("1. 从微博链接获取UID")
     print("2. 通过用户名搜索")
+    print("3. 批量解析链接或用户名")
+    print("4. 多关键词批量搜索用户")
     
-    choice = input("请选择操作方式 (1/2): ").strip()
+    choice = input("请选择操作方式 (1/2/3/4): ").strip()
     
     if choice == '1':
         weibo_url = input("请输入微博用户链接: ").strip()
@@ -145,6 +363,42 @@ def main():
         else:
             print("关键词不能为空")
     
+    elif choice == '3':
+        file_path = input("请输入文件路径（每行一个链接或用户名）: ").strip()
+        if not os.path.exists(file_path):
+            print("文件不存在")
+            return
+        
+        output_file = input("请输入输出文件路径 (默认 user_list.txt): ").strip() or 'user_list.txt'
+        
+        with open(file_path, 'r', encoding='utf-8') as f:
+            items = f.readlines()
+        
+        resolver = BulkUidResolver(proxy_pool=ProxyPool.from_config())
+        results = resolver.resolve(items)
+        uid_file, mapping_file = resolver.save_uid_list(results, output_file)
+        print(f"UID列表已保存到: {uid_file}")
+        print(f"对应关系已保存到: {mapping_file}")
+        print(f"可直接用于批量抓取: python batch_scraper.py")
+    
+    elif choice == '4':
+        file_path = input("请输入关键词文件路径（每行一个关键词）: ").strip()
+        if not os.path.exists(file_path):
+            print("文件不存在")
+            return
+        
+        output_file = input("请输入输出文件路径 (默认 search_users.jsonl): ").strip() or 'search_users.jsonl'
+        try:
+            max_pages = int(input(f"每个关键词最多翻页数 (默认{SEARCH_CONFIG['max_pages']}): ").strip() or SEARCH_CONFIG['max_pages'])
+        except ValueError:
+            max_pages = SEARCH_CONFIG['max_pages']
+        
+        with open(file_path, 'r', encoding='utf-8') as f:
+            keywords = [line for line in f if not line.startswith('#')]
+        
+        engine = UserSearchEngine(max_pages=max_pages, proxy_pool=ProxyPool.from_config())
+        engine.search(keywords, output_file)
+    
     else:
         print("无效选择")
 
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+粉丝/关注关系图抓取
+从种子用户出发按广度优先翻页抓取粉丝和关注列表，发现新用户；
+待扩展队列和已发现用户以整数数组保存，可容纳数百万UID，定期保存断点，
+关注关系逐行写入边列表，发现的用户可直接交给批量抓取
+"""
+
+import os
+import json
+import array
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from config import GRAPH_CONFIG
+from weibo_scraper import WeiboScraper
+from batch_scraper import BatchWeiboScraper
+from get_uid import parse_user_cards
+from proxy_pool import ProxyPool
+from identity_pool import IdentityPool
+from rate_limiter import shared_limiter
+
+# 粉丝列表按 since_id 翻页，关注列表按 page 翻页
+RELATION_CONTAINERS = {
+    'fans': ('231051_-_fans_-_{uid}', 'since_id'),
+    'follow': ('231051_-_followers_-_{uid}', 'page'),
+}
+
+class GraphCrawler:
+    def __init__(self, output_dir, scraper=None, max_depth=None, max_users=None, max_pages=None,
+                 max_workers=None, relations=None, limiter=None):
+        self.output_dir = output_dir
+        self.scraper = scraper or WeiboScraper()
+        # 使用代理池或身份池时由各自的速率限制控制请求间隔
+        self.limiter = limiter or (None if self.scraper.page_delay == 0 else shared_limiter())
+        self.max_depth = max_depth or GRAPH_CONFIG['max_depth']
+        self.max_users = max_users or GRAPH_CONFIG['max_users']
+        self.max_pages = max_pages or GRAPH_CONFIG['max_pages']
+        self.max_workers = max_workers or GRAPH_CONFIG['max_workers']
+        self.relations = relations or GRAPH_CONFIG['relations']
+        self.checkpoint_interval = GRAPH_CONFIG['checkpoint_interval']
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.edge_file = os.path.join(output_dir, 'edges.csv')
+        self.users_file = os.path.join(output_dir, 'users.jsonl')
+        self.meta_file = os.path.join(output_dir, 'checkpoint.json')
+
+        # 已发现的UID按发现顺序保存在数组中，集合只用于判重
+        self.discovered = array.array('q')
+        self.seen = set()
+        self.current = array.array('q')  # 当前层待扩展的UID
+        self.next = array.array('q')  # 下一层待扩展的UID
+        self.depth = 0
+        self.position = 0  # 当前层已扩展到的位置
+        self.edge_count = 0
+
+    def _array_file(self, name):
+        return os.path.join(self.output_dir, f'{name}.bin')
+
+    def _discover(self, uid):
+        """记录新用户，返回是否为新发现"""
+        if uid in self.seen or len(self.discovered) >= self.max_users:
+            return False
+        self.seen.add(uid)
+        self.discovered.append(uid)
+        return True
+
+    def add_seeds(self, uids):
+        """添加种子用户"""
+        for uid in uids:
+            uid = int(uid)
+            if self._discover(uid):
+                self.current.append(uid)
+
+    def save_checkpoint(self):
+        """保存断点：UID数组写入二进制文件，边列表和用户文件记录已写入的长度"""
+        self.edges.flush()
+        self.users.flush()
+        for name in ('discovered', 'current', 'next'):
+            tmp_file = self._array_file(name) + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                getattr(self, name).tofile(f)
+            os.replace(tmp_file, self._array_file(name))
+
+        meta = {
+            'depth': self.depth,
+            'position': self.position,
+            'edge_count': self.edge_count,
+            'edge_file_size': self.edges.tell(),
+            'users_file_size': self.users.tell(),
+        }
+        tmp_file = self.meta_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_file, self.meta_file)
+
+    def load_checkpoint(self):
+        """从断点恢复，丢弃断点之后写入的边和用户，返回是否恢复成功"""
+        if not os.path.exists(self.meta_file):
+            return False
+        with open(self.meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        for name in ('discovered', 'current', 'next'):
+            values = array.array('q')
+            with open(self._array_file(name), 'rb') as f:
+                values.frombytes(f.read())
+            setattr(self, name, values)
+        self.seen = set(self.discovered)
+        self.depth = meta['depth']
+        self.position = meta['position']
+        self.edge_count = meta['edge_count']
+
+        for file_name, size in ((self.edge_file, meta['edge_file_size']), (self.users_file, meta['users_file_size'])):
+            if os.path.exists(file_name):
+                with open(file_name, 'r+b') as f:
+                    f.truncate(size)
+        self.logger.info(f"从断点恢复：第 {self.depth} 层，已发现 {len(self.discovered)} 个用户")
+        return True
+
+    def fetch_relation_page(self, uid, relation, page):
+        """请求一页粉丝或关注列表，返回用户列表，没有更多数据时返回空列表"""
+        container, page_param = RELATION_CONTAINERS[relation]
+        params = {'containerid': container.format(uid=uid), page_param: page}
+        if self.limiter:
+            self.limiter.acquire()
+        response = self.scraper.fetch("https://m.weibo.cn/api/container/getIndex", params)
+        response.raise_for_status()
+        data = response.json()
+        if data.get('ok') != 1:
+            return []
+        return parse_user_cards(data.get('data', {}).get('cards', []))
+
+    def fetch_relations(self, uid):
+        """抓取一个用户的粉丝和关注列表，返回 (关注边列表, 用户列表)，边为 (关注者, 被关注者)"""
+        edges = []
+        users = []
+        for relation in self.relations:
+            for page in range(1, self.max_pages + 1):
+                try:
+                    page_users = self.fetch_relation_page(uid, relation, page)
+                except Exception as e:
+                    self.logger.warning(f"抓取用户 {uid} 的{relation}列表第 {page} 页失败: {e}")
+                    break
+                page_users = [user for user in page_users if user['uid']]
+                if not page_users:
+                    break
+                for user in page_users:
+                    other = int(user['uid'])
+                    edges.append((other, uid) if relation == 'fans' else (uid, other))
+                users.extend(page_users)
+        return edges, users
+
+    def _expand_batch(self, executor, uids):
+        """并发扩展一批用户，按原顺序写出结果，保证断点前后结果一致"""
+        for edges, users in executor.map(self.fetch_relations, uids):
+            for follower, followee in edges:
+                self.edges.write(f'{follower},{followee}\n')
+            self.edge_count += len(edges)
+
+            for user in users:
+                uid = int(user['uid'])
+                if self._discover(uid):
+                    self.users.write(json.dumps(user, ensure_ascii=False) + '\n')
+                    if self.depth + 1 < self.max_depth:
+                        self.next.append(uid)
+
+    def run(self, seeds=None, resume=True):
+        """从种子用户开始抓取，直到达到最大层数或没有待扩展的用户；中断时保存断点"""
+        resumed = resume and self.load_checkpoint()
+        if not resumed:
+            self.add_seeds(seeds or [])
+
+        with open(self.edge_file, 'a' if resumed else 'w', encoding='utf-8') as self.edges, \
+                open(self.users_file, 'a' if resumed else 'w', encoding='utf-8') as self.users:
+            if not resumed:
+                self.edges.write('follower,followee\n')
+            try:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    while self.depth < self.max_depth and self.current:
+                        while self.position < len(self.current):
+                            end = min(self.position + self.checkpoint_interval, len(self.current))
+                            self._expand_batch(executor, self.current[self.position:end])
+                            self.position = end
+                            self.save_checkpoint()
+                            self.logger.info(f"第 {self.depth + 1} 层: 已扩展 {self.position}/{len(self.current)} 个用户，"
+                                             f"共发现 {len(self.discovered)} 个用户，{self.edge_count} 条关系")
+
+                        self.current, self.next = self.next, array.array('q')
+                        self.depth += 1
+                        self.position = 0
+                        self.save_checkpoint()
+            except KeyboardInterrupt:
+                self.logger.warning("已中断，下次运行将从断点继续")
+                raise
+
+        self.save_uid_list()
+        return list(self.discovered)
+
+    def save_uid_list(self, filename=None):
+        """保存所有发现的UID，每行一个，可直接作为批量抓取的用户列表"""
+        filename = filename or os.path.join(self.output_dir, 'uids.txt')
+        with open(filename, 'w', encoding='utf-8') as f:
+            for uid in self.discovered:
+                f.write(f'{uid}\n')
+        return filename
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='微博粉丝/关注关系图抓取')
+    parser.add_argument('seeds', help='种子用户列表文件（每行一个UID，或JSON列表）')
+    parser.add_argument('--output-dir', default=GRAPH_CONFIG['output_dir'], help='输出目录，断点也保存在这里')
+    parser.add_argument('--depth', type=int, default=GRAPH_CONFIG['max_depth'], help='扩展层数')
+    parser.add_argument('--max-users', type=int, default=GRAPH_CONFIG['max_users'], help='最多发现的用户数')
+    parser.add_argument('--workers', type=int, default=GRAPH_CONFIG['max_workers'], help='并发线程数')
+    parser.add_argument('--restart', action='store_true', help='忽略已有断点，重新开始')
+    parser.add_argument('--scrape', action='store_true', help='抓取完成后批量抓取所有发现用户的微博')
+    parser.add_argument('--pages', type=int, default=5, help='批量抓取时每个用户的页数')
+    args = parser.parse_args()
+
+    seeds = BatchWeiboScraper.load_user_list(args.seeds)
+    if not seeds:
+        print("种子用户列表为空")
+        return
+
+    proxy_pool = ProxyPool.from_config()
+    identity_pool = IdentityPool(size=args.workers, proxy_pool=proxy_pool) if args.workers > 1 else None
+    scraper = WeiboScraper(proxy_pool=proxy_pool, identity_pool=identity_pool)
+    crawler = GraphCrawler(args.output_dir, scraper=scraper, max_depth=args.depth, max_users=args.max_users,
+                           max_workers=args.workers)
+    uids = crawler.run(seeds, resume=not args.restart)
+
+    print(f"\n共发现 {len(uids)} 个用户，{crawler.edge_count} 条关注关系")
+    print(f"关系列表: {crawler.edge_file}")
+    print(f"用户列表: {os.path.join(args.output_dir, 'uids.txt')}")
+
+    if args.scrape:
+        batch_scraper = BatchWeiboScraper(proxy_pool=proxy_pool, identity_pool=identity_pool)
+        results = batch_scraper.scrape_multiple_users([str(uid) for uid in uids], args.pages,
+                                                      workers=args.workers)
+        batch_scraper.save_batch_results(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+客户端身份池
+维护多个相互独立的会话（User-Agent、游客Cookie、冷却状态），
+请求总是分配给当前限流最少的身份，被限流的身份进入冷却期
+"""
+
+import time
+import logging
+import threading
+import requests
+from config import IDENTITY_CONFIG, USER_AGENTS, WEIBO_CONFIG
+from rate_limiter import RateLimiter
+from proxy_pool import THROTTLE_STATUS_CODES
+
+class Identity:
+    """单个客户端身份"""
+
+    def __init__(self, index, user_agent, proxy_pool=None):
+        self.index = index
+        self.user_agent = user_agent
+        self.session = proxy_pool.session() if proxy_pool else requests.Session()
+        self.session.headers.update({
+            'User-Agent': user_agent,
+            'Accept': 'application/json, text/plain, */*',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Connection': 'keep-alive',
+            'Referer': 'https://m.weibo.cn/',
+        })
+        self.limiter = RateLimiter(IDENTITY_CONFIG['requests_per_second'], IDENTITY_CONFIG['burst'])
+        self.warmed_up = not IDENTITY_CONFIG['warm_up']
+        self.cooldown_until = 0
+        self.requests = 0
+        self.throttles = 0
+        self.consecutive_throttles = 0
+        self.in_flight = 0
+
+    def warm_up(self):
+        """访问首页获取游客Cookie"""
+        try:
+            self.session.get(WEIBO_CONFIG['base_url'], timeout=10)
+        except requests.RequestException:
+            pass
+        self.warmed_up = True
+
+    def load(self):
+        """调度优先级，越小越优先：近期限流次数、进行中的请求数、历史限流率"""
+        throttle_rate = self.throttles / self.requests if self.requests else 0.0
+        return (self.consecutive_throttles, self.in_flight, throttle_rate)
+
+    def to_dict(self):
+        return {
+            'index': self.index,
+            'user_agent': self.user_agent,
+            'requests': self.requests,
+            'throttles': self.throttles,
+            'cooling_down': self.cooldown_until > time.monotonic(),
+        }
+
+class IdentityPool:
+    def __init__(self, size=None, proxy_pool=None):
+        size = size or IDENTITY_CONFIG['size']
+        # User-Agent 依次从配置中轮流取用
+        self.identities = [Identity(i, USER_AGENTS[i % len(USER_AGENTS)], proxy_pool) for i in range(size)]
+        self.cooldown_seconds = IDENTITY_CONFIG['cooldown_seconds']
+        self.max_cooldown_seconds = IDENTITY_CONFIG['max_cooldown_seconds']
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def acquire(self):
+        """获取当前限流最少、且有请求额度的身份，全部冷却或额度用完时阻塞等待"""
+        while True:
+            now = time.monotonic()
+            with self.lock:
+                ready = sorted((i for i in self.identities if i.cooldown_until <= now), key=Identity.load)
+                chosen = next((i for i in ready if i.limiter.try_acquire()), None)
+                if chosen:
+                    chosen.in_flight += 1
+                elif ready:
+                    wait = min(i.limiter.wait_time() for i in ready)
+                else:
+                    wait = min(i.cooldown_until for i in self.identities) - now
+
+            if chosen:
+                if not chosen.warmed_up:
+                    chosen.warm_up()
+                return chosen
+            time.sleep(max(0.05, wait))
+
+    def release(self, identity, throttled=False):
+        """归还身份并记录请求结果，被限流的身份进入冷却期"""
+        with self.lock:
+            identity.in_flight -= 1
+            identity.requests += 1
+            if throttled:
+                identity.throttles += 1
+                identity.consecutive_throttles += 1
+                cooldown = min(self.cooldown_seconds * 2 ** (identity.consecutive_throttles - 1),
+                               self.max_cooldown_seconds)
+                identity.cooldown_until = time.monotonic() + cooldown
+                self.logger.warning(f"身份 #{identity.index} 被限流，冷却 {cooldown:.0f} 秒")
+            else:
+                identity.consecutive_throttles = 0
+
+    def get(self, url, **kwargs):
+        """使用一个身份发送GET请求"""
+        identity = self.acquire()
+        try:
+            response = identity.session.get(url, **kwargs)
+        except requests.RequestException:
+            self.release(identity)
+            raise
+        self.release(identity, throttled=response.status_code in THROTTLE_STATUS_CODES)
+        return response
+
+    def stats(self):
+        """所有身份的状态"""
+        with self.lock:
+            return [i.to_dict() for i in self.identities]
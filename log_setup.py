@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志配置
+按 config.LOGGING_CONFIG 在进程内配置一次日志：抓取线程只把日志记录放入队列，
+由后台线程写文件和控制台；可选输出JSON行格式，高频日志按比例采样。
+fork 出的子进程中再次调用时重新配置，子进程的日志由它自己的后台线程写出
+"""
+
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+import multiprocessing.util
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from config import LOGGING_CONFIG
+
+# 通过 extra 传入、在JSON日志中单独输出的字段
+STRUCTURED_FIELDS = ('uid', 'page', 'latency', 'mblog_id', 'count', 'suppressed')
+
+_listener = None
+# 启动 _listener 的进程，fork 出的子进程继承了 _listener，但其中的后台线程不在子进程中运行
+_listener_pid = None
+_setup_lock = threading.Lock()
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """带 sample 标记的日志（如逐条微博的解析错误）每 N 条只保留1条，
+    保留的记录中 suppressed 字段为上次保留后被丢弃的条数"""
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(1, every)
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, 'sample', None)
+        if key is None or self.every == 1:
+            return True
+        with self.lock:
+            count = self.counters.get(key, 0)
+            self.counters[key] = count + 1
+        if count % self.every:
+            return False
+        if count:
+            record.suppressed = self.every - 1
+        return True
+
+class _QueueHandler(QueueHandler):
+    """只合并消息参数，不在抓取线程中格式化整行"""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # 异常对象不能跨线程保留，先在当前线程格式化堆栈
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def _text_formatter():
+    return logging.Formatter(LOGGING_CONFIG['format'])
+
+def setup_logging(file_name=None):
+    """配置根日志记录器，同一进程中多次调用只生效一次；file_name 默认使用 LOGGING_CONFIG['file_name']"""
+    global _listener, _listener_pid
+    with _setup_lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            return
+        root = logging.getLogger()
+        if _listener is not None:
+            # fork 出的子进程：继承来的队列没有线程读取，换成新的队列和后台线程
+            _remove_queue_handlers()
+        root.setLevel(LOGGING_CONFIG['level'])
+
+        handlers = []
+        file_name = file_name or LOGGING_CONFIG['file_name']
+        if file_name:
+            file_handler = logging.FileHandler(file_name, encoding='utf-8')
+            file_handler.setFormatter(JsonFormatter() if LOGGING_CONFIG['json_lines'] else _text_formatter())
+            handlers.append(file_handler)
+        if LOGGING_CONFIG['console']:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(_text_formatter())
+            handlers.append(console_handler)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(LOGGING_CONFIG['sample_every']))
+        root.addHandler(queue_handler)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _listener_pid = os.getpid()
+        atexit.register(shutdown_logging)
+        # multiprocessing 的子进程退出时不执行 atexit，通过它的退出回调写出剩余日志
+        multiprocessing.util.Finalize(None, shutdown_logging, exitpriority=0)
+
+def _remove_queue_handlers():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, _QueueHandler):
+            root.removeHandler(handler)
+
+def shutdown_logging():
+    """写出队列中剩余的日志并停止后台线程"""
+    global _listener
+    with _setup_lock:
+        if _listener is None or _listener_pid != os.getpid():
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _remove_queue_handlers()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+微博媒体文件下载器
+并发下载微博中的图片和视频，支持断点续传，按内容哈希存储实现去重；
+同一进程中的多个下载器可以共用一个输出目录：同一链接同时只有一个线程写临时文件，URL索引保存时合并
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from config import MEDIA_CONFIG, REQUEST_CONFIG, USER_AGENTS
+
+# 按链接哈希分组的锁，进程内所有下载器共用，同一链接的临时文件同时只有一个线程读写
+_PART_LOCKS = [threading.Lock() for _ in range(256)]
+# 保存URL索引时的锁，重新读取、合并、替换文件期间持有
+_INDEX_FILE_LOCK = threading.Lock()
+
+class MediaDownloader:
+    def __init__(self, output_dir=None, max_workers=None, per_host_limit=None, session=None):
+        self.output_dir = output_dir or MEDIA_CONFIG['output_dir']
+        self.max_workers = max_workers or MEDIA_CONFIG['max_workers']
+        self.per_host_limit = per_host_limit or MEDIA_CONFIG['per_host_limit']
+        self.chunk_size = MEDIA_CONFIG['chunk_size']
+        self.hash_algorithm = MEDIA_CONFIG['hash_algorithm']
+
+        # objects/ 存放按哈希命名的文件，tmp/ 存放未完成的下载
+        self.objects_dir = os.path.join(self.output_dir, 'objects')
+        self.tmp_dir = os.path.join(self.output_dir, 'tmp')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENTS[0],
+            'Referer': 'https://m.weibo.cn/',  # 新浪图床会校验Referer
+        })
+
+        self.logger = logging.getLogger(__name__)
+
+        # URL -> 本地文件，跨运行持久化，重复的链接不会再次下载
+        self.url_index_file = os.path.join(self.output_dir, 'url_index.json')
+        self.url_index = self._load_url_index()
+        self._index_lock = threading.Lock()
+
+        self._host_semaphores = {}
+        self._host_lock = threading.Lock()
+
+    def _load_url_index(self):
+        """加载URL索引"""
+        if not os.path.exists(self.url_index_file):
+            return {}
+        try:
+            with open(self.url_index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"加载URL索引失败，将重新建立: {e}")
+            return {}
+
+    def _save_url_index(self):
+        """保存URL索引：重新读取文件，合并其他下载器写入的条目后替换（先写临时文件，避免中断时损坏）"""
+        tmp_file = f'{self.url_index_file}.{os.getpid()}.tmp'
+        with _INDEX_FILE_LOCK:
+            merged = self._load_url_index()
+            with self._index_lock:
+                merged.update(self.url_index)
+                self.url_index = merged
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(merged, f, ensure_ascii=False)
+            os.replace(tmp_file, self.url_index_file)
+
+    def _host_semaphore(self, url):
+        """获取域名对应的并发限制信号量"""
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_semaphores[host]
+
+    def collect_media(self, weibos):
+        """从微博数据中收集媒体链接，返回 {微博ID: [链接列表]}"""
+        media = {}
+        for weibo in weibos:
+            urls = [url for url in weibo.get('pics') or [] if url]
+            if weibo.get('video_url'):
+                urls.append(weibo['video_url'])
+            if urls:
+                media[str(weibo.get('id'))] = urls
+        return media
+
+    def _object_path(self, digest, url):
+        """根据内容哈希生成存储路径"""
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+        return os.path.join(self.objects_dir, digest[:2], digest + ext)
+
+    def _download(self, url):
+        """下载单个文件，支持Range断点续传，返回本地路径"""
+        cached = self.url_index.get(url)
+        if cached and os.path.exists(cached):
+            return cached
+
+        url_hash = hashlib.sha1(url.encode('utf-8')).digest()
+        with _PART_LOCKS[url_hash[0]]:
+            # 等锁期间其他线程可能已下载完同一链接
+            cached = self.url_index.get(url)
+            if cached and os.path.exists(cached):
+                return cached
+            return self._download_locked(url, os.path.join(self.tmp_dir, url_hash.hex() + '.part'))
+
+    def _download_locked(self, url, part_file):
+        """持有该链接的锁时下载到 part_file"""
+        last_error = None
+
+        for attempt in range(1, REQUEST_CONFIG['retry_times'] + 1):
+            try:
+                with self._host_semaphore(url):
+                    hasher = hashlib.new(self.hash_algorithm)
+                    headers = {}
+                    existing = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+                    if existing:
+                        headers['Range'] = f'bytes={existing}-'
+
+                    response = self.session.get(url, headers=headers, stream=True,
+                                                timeout=REQUEST_CONFIG['timeout'])
+                    with response:
+                        if response.status_code == 416:
+                            # 服务端认为已下载完整
+                            mode = None
+                        elif response.status_code == 206 and existing:
+                            mode = 'ab'
+                        else:
+                            response.raise_for_status()
+                            mode = 'wb'
+
+                        if mode != 'wb' and existing:
+                            # 续传时需要先把已下载的部分计入哈希
+                            with open(part_file, 'rb') as f:
+                                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                                    hasher.update(chunk)
+
+                        if mode:
+                            with open(part_file, mode) as f:
+                                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                                    if chunk:
+                                        f.write(chunk)
+                                        hasher.update(chunk)
+
+                object_path = self._object_path(hasher.hexdigest(), url)
+                if os.path.exists(object_path):
+                    # 内容相同的文件已存在，直接丢弃本次下载
+                    os.remove(part_file)
+                else:
+                    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                    os.replace(part_file, object_path)
+
+                with self._index_lock:
+                    self.url_index[url] = object_path
+                return object_path
+
+            except Exception as e:
+                last_error = e
+                self.logger.warning(f"下载失败（第 {attempt} 次）{url}: {e}")
+
+        self.logger.error(f"下载失败，已放弃 {url}: {last_error}")
+        return None
+
+    def download_weibos(self, weibos):
+        """并发下载微博中的所有媒体文件，返回 {微博ID: [本地路径列表]}"""
+        media = self.collect_media(weibos)
+        unique_urls = list(dict.fromkeys(url for urls in media.values() for url in urls))
+        self.logger.info(f"共 {len(media)} 条微博包含媒体，去重后 {len(unique_urls)} 个文件待下载")
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._download, url): url for url in unique_urls}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+
+        self._save_url_index()
+
+        manifest = {}
+        for mblog_id, urls in media.items():
+            manifest[mblog_id] = [results[url] for url in urls if results.get(url)]
+
+        failed = sum(1 for path in results.values() if not path)
+        self.logger.info(f"媒体下载完成，成功 {len(results) - failed} 个，失败 {failed} 个")
+        return manifest
+
+    def save_manifest(self, manifest, filename):
+        """保存媒体清单"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        self.logger.info(f"媒体清单已保存到 {filename}")
+
+def main():
+    """主函数 - 为已抓取的微博数据下载媒体文件"""
+    json_file = input("请输入微博数据文件路径 (weibos.json/weibos.jsonl.gz等): ").strip()
+    if not os.path.exists(json_file):
+        print("文件不存在")
+        return
+
+    # output_reader 依赖 weibo_scraper，而 weibo_scraper 依赖本模块，在这里导入避免循环导入
+    from output_reader import iter_records
+    weibos = list(iter_records(json_file))
+
+    downloader = MediaDownloader()
+    manifest = downloader.download_weibos(weibos)
+
+    manifest_file = os.path.join(os.path.dirname(json_file), 'media_manifest.json')
+    downloader.save_manifest(manifest, manifest_file)
+
+    print(f"\n下载完成！")
+    print(f"包含媒体的微博数: {len(manifest)}")
+    print(f"媒体文件目录: {downloader.objects_dir}")
+    print(f"媒体清单: {manifest_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+微博用户持续监控
+按优先队列调度用户的轮询时间，轮询间隔根据每个用户的发博频率自动调整，
+每次只抓取上次之后的新微博，用户信息缓存在调度状态中定期刷新，调度状态持久化，重启后继续
+"""
+
+import os
+import json
+import time
+import heapq
+import signal
+import logging
+import argparse
+from config import MONITOR_CONFIG
+from weibo_scraper import WeiboScraper
+from batch_scraper import BatchWeiboScraper
+from proxy_pool import ProxyPool
+
+class MonitorDaemon:
+    def __init__(self, scraper=None, state_file=None):
+        self.scraper = scraper or WeiboScraper()
+        self.state_file = state_file or MONITOR_CONFIG['state_file']
+        self.min_interval = MONITOR_CONFIG['min_interval']
+        self.max_interval = MONITOR_CONFIG['max_interval']
+        self.initial_interval = MONITOR_CONFIG['initial_interval']
+        self.target = MONITOR_CONFIG['target_posts_per_poll']
+        self.alpha = MONITOR_CONFIG['rate_alpha']
+        self.max_pages = MONITOR_CONFIG['max_pages']
+        self.user_info_ttl = MONITOR_CONFIG['user_info_ttl']
+        self.logger = logging.getLogger(__name__)
+        self.running = False
+
+        # UID -> {next_poll, last_poll, last_seen_id, rate, polls, new_posts, user_info, info_time}
+        self.users = self._load_state()
+        self.queue = []
+
+    def _load_state(self):
+        """加载调度状态"""
+        if not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_state(self):
+        """保存调度状态"""
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.users, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def set_users(self, uids):
+        """设置监控的用户列表，新用户立即轮询，已有用户沿用保存的调度"""
+        now = time.time()
+        self.queue = []
+        for uid in dict.fromkeys(str(u) for u in uids):
+            state = self.users.setdefault(uid, {
+                'next_poll': now,
+                'last_poll': None,
+                'last_seen_id': None,
+                'rate': None,  # 每秒发博数
+                'polls': 0,
+                'new_posts': 0,
+            })
+            self.queue.append((state['next_poll'], uid))
+        heapq.heapify(self.queue)
+
+    def _interval(self, state):
+        """根据发博频率计算下次轮询间隔"""
+        if state['rate'] is None:
+            return self.initial_interval
+        if state['rate'] <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target / state['rate']))
+
+    def poll(self, uid):
+        """抓取用户的新微博并更新调度状态"""
+        state = self.users[uid]
+        now = time.time()
+
+        # 用户信息未过期时直接使用，每次轮询只请求微博列表
+        user_info = state.get('user_info') if now - state.get('info_time', 0) <= self.user_info_ttl else None
+        result = self.scraper.scrape_user_weibos(uid, max_pages=self.max_pages, since_id=state['last_seen_id'],
+                                                 user_info=user_info)
+        state['polls'] += 1
+        if result is None:
+            # 抓取失败时不更新频率，按当前间隔重试
+            self.logger.warning(f"用户 {uid} 抓取失败")
+            state['next_poll'] = now + self._interval(state)
+            return 0
+
+        if user_info is None:
+            state['user_info'] = result['user_info']
+            state['info_time'] = now
+
+        weibos = result['weibos']
+        new_count = len(weibos)
+        ids = [int(w['id']) for w in weibos if w.get('id')]
+        if ids:
+            state['last_seen_id'] = str(max([int(state['last_seen_id'] or 0)] + ids))
+
+        # 用两次轮询之间的新微博数更新发博频率的滑动平均
+        if state['last_poll']:
+            observed = new_count / max(1.0, now - state['last_poll'])
+            state['rate'] = observed if state['rate'] is None else \
+                self.alpha * observed + (1 - self.alpha) * state['rate']
+        state['last_poll'] = now
+        state['new_posts'] += new_count
+        state['next_poll'] = now + self._interval(state)
+
+        self.logger.info(f"用户 {uid}: 新微博 {new_count} 条，{self._interval(state) / 60:.0f} 分钟后再次轮询")
+        return new_count
+
+    def stop(self, *args):
+        """停止监控（当前用户处理完后退出）"""
+        self.running = False
+
+    def run(self):
+        """持续运行，直到收到停止信号"""
+        self.running = True
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        self.logger.info(f"开始监控 {len(self.queue)} 个用户")
+
+        while self.running and self.queue:
+            next_poll, uid = self.queue[0]
+            wait = next_poll - time.time()
+            if wait > 0:
+                # 分段等待以便及时响应停止信号
+                time.sleep(min(wait, 1.0))
+                continue
+
+            heapq.heappop(self.queue)
+            try:
+                self.poll(uid)
+            except Exception as e:
+                self.logger.error(f"轮询用户 {uid} 出现异常: {e}")
+                self.users[uid]['next_poll'] = time.time() + self._interval(self.users[uid])
+            heapq.heappush(self.queue, (self.users[uid]['next_poll'], uid))
+            self.save_state()
+
+        self.save_state()
+        self.logger.info("监控已停止，调度状态已保存")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='微博用户持续监控')
+    parser.add_argument('user_list', help='用户列表文件（每行一个UID，或JSON列表）')
+    parser.add_argument('--state-file', default=MONITOR_CONFIG['state_file'], help='调度状态文件')
+    args = parser.parse_args()
+
+    uids = BatchWeiboScraper.load_user_list(args.user_list)
+    if not uids:
+        print("用户列表为空")
+        return
+
+    daemon = MonitorDaemon(scraper=WeiboScraper(proxy_pool=ProxyPool.from_config()), state_file=args.state_file)
+    daemon.set_users(uids)
+    daemon.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取输出的随机读取
+为 weibos.json（indent=2 的JSON数组）和 .jsonl 输出文件建立旁路偏移索引（<文件名>.idx），
+按微博ID、用户ID、发布日期定位记录，通过内存映射只解码需要的记录，不必加载整个文件；
+.gz/.zst 压缩文件边读边解压，偏移为解压后的位置；gzip文件还记录每个成员的位置，随机读取时从所在成员开始解压
+"""
+
+import io
+import os
+import re
+import json
+import mmap
+import zlib
+import sqlite3
+import argparse
+from datetime import datetime
+from weibo_scraper import CST, parse_time_bound
+from output_writer import COMPRESSION_EXTENSIONS, compression_of, open_input
+
+# indent=2 的JSON数组中每条记录以单独一行的 "  {" 开始、以 "  }" 结束，
+# 更深层的对象缩进更多，字符串中的换行会被转义，因此不会误匹配
+JSON_RECORD_START = b'\n  {\n'
+JSON_RECORD_END = b'\n  }'
+# 缩进4个空格的键只出现在记录的顶层
+JSON_KEY_PATTERN = re.compile(rb'\n    "(id|user_id|created_timestamp)": (?:"([^"]*)"|([^,\n]*))')
+INDEX_VERSION = 2
+# 解压跳过数据时每次读取的大小
+SKIP_CHUNK_SIZE = 1 << 20
+
+def _open_mmap(filename):
+    """只读映射文件，空文件返回 None"""
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def _file_format(filename):
+    compression = compression_of(filename)
+    if compression:
+        filename = filename[:-len(COMPRESSION_EXTENSIONS[compression])]
+    return 'jsonl' if filename.endswith('.jsonl') else 'json'
+
+def _scan_json(mm, start=0):
+    """扫描JSON数组，依次返回每条记录的 (偏移, 原始字节)"""
+    pos = mm.find(JSON_RECORD_START, start)
+    while pos != -1:
+        begin = pos + 3
+        end = mm.find(JSON_RECORD_END, begin)
+        if end == -1:
+            break
+        end += len(JSON_RECORD_END)
+        yield begin, mm[begin:end]
+        pos = mm.find(JSON_RECORD_START, end)
+
+def _scan_jsonl(mm, start=0):
+    """扫描JSON Lines，依次返回每条记录的 (偏移, 原始字节)，末尾不完整的行不计入"""
+    pos = start
+    while True:
+        end = mm.find(b'\n', pos)
+        if end == -1:
+            break
+        if mm[pos:end].strip():
+            yield pos, mm[pos:end]
+        pos = end + 1
+
+def _scan_stream(f, file_format):
+    """逐行扫描（解压后的）二进制流，返回与 _scan_json/_scan_jsonl 相同的结果"""
+    offset = 0
+    begin, lines = None, None
+    for line in f:
+        if file_format == 'jsonl':
+            if line.endswith(b'\n') and line.strip():
+                yield offset, line[:-1]
+        elif lines is None:
+            if line == b'  {\n':
+                begin, lines = offset + 2, [b'{\n']
+        elif line.startswith(b'  }'):
+            lines.append(b'  }')
+            yield begin, b''.join(lines)
+            lines = None
+        else:
+            lines.append(line)
+        offset += len(line)
+
+class GzipMemberReader(io.RawIOBase):
+    """从 offset 处开始逐个成员解压gzip文件，members 记录读到的每个成员的 (压缩偏移, 解压后偏移)，
+    offset 必须是某个成员的开头"""
+
+    def __init__(self, filename, offset=0, decompressed_offset=0):
+        super().__init__()
+        self.file = open(filename, 'rb')
+        self.file.seek(offset)
+        self.consumed = offset
+        self.position = decompressed_offset
+        self.input = b''
+        self.decompressor = None
+        self.members = []
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while True:
+            if not self.input:
+                self.input = self.file.read(SKIP_CHUNK_SIZE)
+                if not self.input:
+                    if self.decompressor is not None:
+                        raise EOFError("gzip文件不完整")
+                    return 0
+            if self.decompressor is None:
+                if not self.input.strip(b'\0'):
+                    # 末尾的填充字节
+                    self.consumed += len(self.input)
+                    self.input = b''
+                    continue
+                self.members.append((self.consumed, self.position))
+                self.decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            data = self.decompressor.decompress(self.input, len(buffer))
+            remaining = self.decompressor.unused_data if self.decompressor.eof else self.decompressor.unconsumed_tail
+            self.consumed += len(self.input) - len(remaining)
+            self.input = remaining
+            if self.decompressor.eof:
+                self.decompressor = None
+            if data:
+                buffer[:len(data)] = data
+                self.position += len(data)
+                return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+def _record_keys(raw, file_format):
+    """从一条记录的原始字节中取出索引字段"""
+    if file_format == 'jsonl':
+        record = json.loads(raw)
+        return record.get('id'), record.get('user_id'), record.get('created_timestamp')
+    keys = {}
+    for match in JSON_KEY_PATTERN.finditer(raw):
+        name = match.group(1).decode()
+        if name not in keys:
+            keys[name] = match.group(2).decode() if match.group(2) is not None else match.group(3).decode().strip()
+    timestamp = keys.get('created_timestamp')
+    return keys.get('id'), keys.get('user_id'), None if timestamp in (None, 'null') else int(float(timestamp))
+
+def iter_records(filename):
+    """不建索引，按文件顺序逐条解码记录，内存占用与文件大小无关"""
+    file_format = _file_format(filename)
+    if compression_of(filename):
+        with open_input(filename, 'rb') as f:
+            for offset, raw in _scan_stream(f, file_format):
+                yield json.loads(raw)
+        return
+    mm = _open_mmap(filename)
+    if mm is None:
+        return
+    try:
+        scan = _scan_jsonl if file_format == 'jsonl' else _scan_json
+        for offset, raw in scan(mm):
+            yield json.loads(raw)
+    finally:
+        mm.close()
+
+def find_output_file(output_dir, name='weibos'):
+    """在输出目录中查找JSON或JSON Lines格式的输出文件（可能已压缩），找不到时返回 None"""
+    for extension in ('.jsonl', '.json'):
+        for suffix in ('', *COMPRESSION_EXTENSIONS.values()):
+            filename = os.path.join(output_dir, name + extension + suffix)
+            if os.path.exists(filename):
+                return filename
+    return None
+
+class OutputReader:
+    """带旁路索引的输出文件读取器，索引缺失或源文件变化时自动重建，
+    未压缩的 .jsonl 文件只是追加了新记录时只索引新增部分；
+    压缩文件不能内存映射，按偏移顺序读取时边解压边前进；往回读时gzip文件从记录所在的成员开始解压，
+    只有一个成员的gzip文件和zstd文件从头解压"""
+
+    def __init__(self, filename, index_file=None):
+        self.filename = filename
+        self.index_file = index_file or filename + '.idx'
+        self.format = _file_format(filename)
+        self.compression = compression_of(filename)
+        self.mm = None
+        self.stream = None
+        self.stream_position = 0
+        self.conn = sqlite3.connect(self.index_file)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+            CREATE TABLE IF NOT EXISTS records (
+                offset INTEGER PRIMARY KEY,
+                length INTEGER,
+                id TEXT,
+                user_id TEXT,
+                created_timestamp INTEGER,
+                created_date TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_records_id ON records (id);
+            CREATE INDEX IF NOT EXISTS idx_records_user ON records (user_id, created_timestamp);
+            CREATE INDEX IF NOT EXISTS idx_records_date ON records (created_date);
+            CREATE TABLE IF NOT EXISTS members (offset INTEGER PRIMARY KEY, compressed_offset INTEGER);
+        """)
+        self.refresh()
+
+    def _meta(self):
+        return dict(self.conn.execute('SELECT key, value FROM meta'))
+
+    def refresh(self):
+        """检查源文件是否变化，需要时更新索引和内存映射，返回新索引的记录数"""
+        stat = os.stat(self.filename)
+        meta = self._meta()
+        if meta.get('version') == INDEX_VERSION and meta.get('size') == stat.st_size \
+                and meta.get('mtime') == stat.st_mtime:
+            if self.mm is None and not self.compression:
+                self.mm = _open_mmap(self.filename)
+            return 0
+
+        self._close_files()
+        if not self.compression:
+            self.mm = _open_mmap(self.filename)
+
+        start = 0
+        if self.format == 'jsonl' and not self.compression and meta.get('version') == INDEX_VERSION \
+                and stat.st_size > meta.get('size', 0):
+            # 追加写入：从上次索引到的位置继续
+            start = meta.get('indexed_to', 0)
+        with self.conn:
+            if start == 0:
+                self.conn.execute('DELETE FROM records')
+                self.conn.execute('DELETE FROM members')
+            indexed_to, added = start, 0
+            member_reader = None
+            if self.compression == 'gzip':
+                member_reader = GzipMemberReader(self.filename)
+                stream = io.BufferedReader(member_reader, SKIP_CHUNK_SIZE)
+                records = _scan_stream(stream, self.format)
+            elif self.compression:
+                stream = open_input(self.filename, 'rb')
+                records = _scan_stream(stream, self.format)
+            else:
+                stream = None
+                scan = _scan_jsonl if self.format == 'jsonl' else _scan_json
+                records = scan(self.mm, start) if self.mm is not None else ()
+            try:
+                rows = []
+                for offset, raw in records:
+                    mblog_id, user_id, timestamp = _record_keys(raw, self.format)
+                    created_date = datetime.fromtimestamp(timestamp, CST).strftime('%Y-%m-%d') if timestamp else None
+                    rows.append((offset, len(raw), None if mblog_id is None else str(mblog_id),
+                                 None if user_id is None else str(user_id), timestamp, created_date))
+                    indexed_to = offset + len(raw) + 1
+                    if len(rows) >= 10000:
+                        self.conn.executemany('INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?)', rows)
+                        added += len(rows)
+                        rows = []
+                self.conn.executemany('INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?)', rows)
+                added += len(rows)
+                if member_reader is not None:
+                    self.conn.executemany('INSERT OR REPLACE INTO members VALUES (?, ?)',
+                                          [(offset, compressed) for compressed, offset in member_reader.members])
+            finally:
+                if stream is not None:
+                    stream.close()
+            self.conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', [
+                ('version', INDEX_VERSION), ('size', stat.st_size), ('mtime', stat.st_mtime),
+                ('indexed_to', indexed_to)])
+        return added
+
+    def _member(self, offset):
+        """返回包含解压后偏移 offset 的gzip成员的 (解压后偏移, 压缩偏移)，zstd文件返回文件开头"""
+        row = self.conn.execute('SELECT offset, compressed_offset FROM members WHERE offset <= ? '
+                                'ORDER BY offset DESC LIMIT 1', (offset,)).fetchone()
+        return row or (0, 0)
+
+    def _read(self, offset, length):
+        if not self.compression:
+            return json.loads(self.mm[offset:offset + length])
+        # 解压流不能 seek：自己记录解压后的位置，往前跳时读取并丢弃中间的数据
+        member_offset, compressed_offset = self._member(offset)
+        if self.stream is None or not member_offset <= self.stream_position <= offset:
+            if self.stream is not None:
+                self.stream.close()
+            if self.compression == 'gzip':
+                self.stream = io.BufferedReader(GzipMemberReader(self.filename, compressed_offset, member_offset),
+                                                SKIP_CHUNK_SIZE)
+                self.stream_position = member_offset
+            else:
+                self.stream = open_input(self.filename, 'rb')
+                self.stream_position = 0
+        while self.stream_position < offset:
+            skipped = len(self.stream.read(min(offset - self.stream_position, SKIP_CHUNK_SIZE)))
+            if not skipped:
+                raise EOFError(f"{self.filename} 比索引记录的短，请删除 {self.index_file} 后重试")
+            self.stream_position += skipped
+        raw = self.stream.read(length)
+        self.stream_position += len(raw)
+        return json.loads(raw)
+
+    def get(self, mblog_id):
+        """按微博ID读取一条记录，不存在时返回 None"""
+        row = self.conn.execute('SELECT offset, length FROM records WHERE id = ? LIMIT 1',
+                                (str(mblog_id),)).fetchone()
+        return self._read(*row) if row else None
+
+    def iter(self, uid=None, since=None, until=None, date=None):
+        """按文件顺序逐条返回满足条件的记录，只解码匹配的记录；
+        since/until 为时间或"YYYY-MM-DD"字符串，date 为发布日期（北京时间）"""
+        conditions, params = [], []
+        if uid is not None:
+            conditions.append('user_id = ?')
+            params.append(str(uid))
+        since_ts = parse_time_bound(since)
+        if since_ts is not None:
+            conditions.append('created_timestamp >= ?')
+            params.append(since_ts)
+        until_ts = parse_time_bound(until)
+        if until_ts is not None:
+            conditions.append('created_timestamp <= ?')
+            params.append(until_ts)
+        if date:
+            conditions.append('created_date = ?')
+            params.append(date)
+        where = f'WHERE {" AND ".join(conditions)} ' if conditions else ''
+        cursor = self.conn.execute(f'SELECT offset, length FROM records {where}ORDER BY offset', params)
+        for offset, length in cursor:
+            yield self._read(offset, length)
+
+    def by_user(self, uid):
+        return self.iter(uid=uid)
+
+    def ids(self):
+        """返回文件中所有微博ID，不解码记录"""
+        return [row[0] for row in self.conn.execute('SELECT id FROM records ORDER BY offset')]
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def __iter__(self):
+        return self.iter()
+
+    def _close_files(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def close(self):
+        self._close_files()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='按微博ID、用户或日期读取抓取输出')
+    parser.add_argument('file', help='weibos.json 或 .jsonl 文件（可以是 .gz/.zst 压缩文件），首次读取时建立索引')
+    parser.add_argument('--id', help='微博ID')
+    parser.add_argument('--uid', help='用户ID')
+    parser.add_argument('--since', help='起始时间，如 2024-01-01')
+    parser.add_argument('--until', help='结束时间')
+    parser.add_argument('--date', help='发布日期，如 2024-01-01')
+    parser.add_argument('--limit', type=int, default=20, help='最多输出条数')
+    args = parser.parse_args()
+
+    with OutputReader(args.file) as reader:
+        if args.id:
+            record = reader.get(args.id)
+            print(json.dumps(record, ensure_ascii=False, indent=2) if record else f"没有找到微博 {args.id}")
+            return
+
+        matched = 0
+        for record in reader.iter(uid=args.uid, since=args.since, until=args.until, date=args.date):
+            if matched >= args.limit:
+                break
+            matched += 1
+            text = (record.get('text') or '').replace('\n', ' ')
+            print(f"[{record.get('created_at')}] {record.get('user_name')} {text[:80]}  (ID {record.get('id')})")
+        print(f"索引中共 {len(reader)} 条记录，显示 {matched} 条")
+
+if __name__ == "__main__":
+    main()
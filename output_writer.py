@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式输出
+逐条写出微博记录，不需要在内存中保留全部结果，
+输出的CSV/JSON文件格式与 pandas to_csv 和 json.dump(indent=2) 的结果一致；
+可以边写边压缩（gzip/zstd），大文件可用多线程压缩
+"""
+
+import io
+import os
+import csv
+import gzip
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import OUTPUT_CONFIG
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+FORMAT_EXTENSIONS = {'csv': ('.csv',), 'json': ('.json',), 'both': ('.csv', '.json'), 'jsonl': ('.jsonl',)}
+# gzip压缩时每块（独立的gzip成员）解压后的大小，随机读取一条记录最多解压一块多
+GZIP_BLOCK_SIZE = 1 << 20
+
+def resolve_compression(compression):
+    """未安装 zstandard 时改用gzip"""
+    if compression == 'zstd' and zstandard is None:
+        return 'gzip'
+    return compression or None
+
+def compression_of(filename):
+    """根据扩展名判断压缩方式"""
+    for compression, extension in COMPRESSION_EXTENSIONS.items():
+        if filename.endswith(extension):
+            return compression
+    return None
+
+class ParallelGzipWriter(io.RawIOBase):
+    """分块gzip压缩：数据按块压缩成独立的gzip成员，按顺序拼接写出，
+    结果是合法的多成员gzip文件，gzip模块、pandas和命令行工具都能直接读取；
+    OutputReader 在索引中记录每个成员的位置，随机读取时直接跳到所在的成员。
+    threads 大于0时各块分给线程池并行压缩"""
+
+    def __init__(self, filename, level=6, threads=4):
+        super().__init__()
+        self.file = open(filename, 'wb')
+        self.level = level
+        self.executor = ThreadPoolExecutor(max_workers=threads) if threads > 0 else None
+        self.max_pending = threads * 2
+        self.pending = deque()
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def _submit(self):
+        if self.executor is None:
+            self.file.write(gzip.compress(bytes(self.buffer), self.level))
+            self.buffer = bytearray()
+            return
+        self.pending.append(self.executor.submit(gzip.compress, bytes(self.buffer), self.level))
+        self.buffer = bytearray()
+        # 压缩跟不上时等最早的一块完成，限制内存占用
+        while len(self.pending) > self.max_pending:
+            self.file.write(self.pending.popleft().result())
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= GZIP_BLOCK_SIZE:
+            self._submit()
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        if self.buffer:
+            self._submit()
+        while self.pending:
+            self.file.write(self.pending.popleft().result())
+        if self.executor is not None:
+            self.executor.shutdown()
+        self.file.close()
+        super().close()
+
+def open_output(filename, compression=None, level=None, threads=None, encoding='utf-8', newline=None):
+    """打开文本输出文件，按 compression 边写边压缩，threads 大于0时多线程压缩；
+    gzip总是分块写成多个成员，便于随机读取"""
+    compression = resolve_compression(compression)
+    level = level or OUTPUT_CONFIG['compression_level']
+    threads = OUTPUT_CONFIG['compression_threads'] if threads is None else threads
+    if compression == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=level, threads=threads)
+        raw = compressor.stream_writer(open(filename, 'wb'))
+    elif compression == 'gzip':
+        raw = ParallelGzipWriter(filename, level, threads)
+    else:
+        return open(filename, 'w', encoding=encoding, newline=newline)
+    return io.TextIOWrapper(io.BufferedWriter(raw, GZIP_BLOCK_SIZE), encoding=encoding, newline=newline)
+
+def open_input(filename, mode='r', encoding='utf-8', newline=None):
+    """打开文件读取，按扩展名透明解压，mode 为 r（文本）或 rb（二进制）"""
+    compression = compression_of(filename)
+    if compression == 'gzip':
+        if mode == 'rb':
+            return gzip.open(filename, 'rb')
+        return gzip.open(filename, 'rt', encoding=encoding, newline=newline)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("读取zstd文件需要安装 zstandard: pip install zstandard")
+        raw = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(filename, 'rb'), closefd=True))
+        return raw if mode == 'rb' else io.TextIOWrapper(raw, encoding=encoding, newline=newline)
+    if mode == 'rb':
+        return open(filename, 'rb')
+    return open(filename, 'r', encoding=encoding, newline=newline)
+
+class CsvStreamWriter:
+    """逐行写CSV，列由第一条记录确定；列表和字典按与pandas相同的方式转为文本"""
+
+    def __init__(self, filename, encoding=None, compression=None):
+        self.file = open_output(filename, compression, encoding=encoding or OUTPUT_CONFIG['encoding'], newline='')
+        self.writer = None
+
+    @staticmethod
+    def _cell(value):
+        if value is None:
+            return ''
+        if isinstance(value, (list, dict)):
+            return str(value)
+        return value
+
+    def write(self, record):
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(record), extrasaction='ignore')
+            self.writer.writeheader()
+        self.writer.writerow({key: self._cell(value) for key, value in record.items()})
+
+    def close(self):
+        self.file.close()
+
+class JsonArrayStreamWriter:
+    """逐条写JSON数组，结果与 json.dump(records, f, ensure_ascii=False, indent=2) 相同"""
+
+    def __init__(self, filename, compression=None):
+        self.file = open_output(filename, compression)
+        self.count = 0
+
+    def write(self, record):
+        item = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+        self.file.write(('[\n  ' if not self.count else ',\n  ') + item)
+        self.count += 1
+
+    def close(self):
+        self.file.write('\n]' if self.count else '[]')
+        self.file.close()
+
+class JsonLinesStreamWriter:
+    """逐条写紧凑的JSON Lines，每行一条记录"""
+
+    def __init__(self, filename, compression=None):
+        self.file = open_output(filename, compression)
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def close(self):
+        self.file.close()
+
+WRITERS = {'.csv': CsvStreamWriter, '.json': JsonArrayStreamWriter, '.jsonl': JsonLinesStreamWriter}
+
+class StreamOutput:
+    """按输出格式（csv/json/both/jsonl）同时写多个文件，可在多个线程中共用；
+    compression 为 None 时按 OUTPUT_CONFIG，为 False 时不压缩，压缩后的文件名加上 .gz/.zst"""
+
+    def __init__(self, output_dir, save_format=None, name='weibos', compression=None):
+        save_format = save_format or OUTPUT_CONFIG['default_format']
+        compression = resolve_compression(OUTPUT_CONFIG['compression'] if compression is None else compression)
+        os.makedirs(output_dir, exist_ok=True)
+        self.files = []
+        self.writers = []
+        for extension in FORMAT_EXTENSIONS[save_format]:
+            self.files.append(os.path.join(output_dir, name + extension + COMPRESSION_EXTENSIONS.get(compression, '')))
+            self.writers.append(WRITERS[extension](self.files[-1], compression=compression))
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def write(self, record):
+        with self.lock:
+            for writer in self.writers:
+                writer.write(record)
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            for writer in self.writers:
+                writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
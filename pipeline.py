@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程流水线批量抓取
+多个线程并发请求微博列表页，原始响应交给进程池做JSON解码和解析，
+单独的写入线程按页序把结果逐条写出；等待解析的页数和等待写出的用户数都有上限，
+下游处理不过来时抓取线程会暂停，内存占用不随用户数增长
+"""
+
+import os
+import json
+import queue
+import logging
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from config import PIPELINE_CONFIG, ARCHIVE_CONFIG
+from weibo_scraper import WeiboScraper, CST
+from batch_scraper import BatchWeiboScraper
+from output_writer import StreamOutput
+from archive import RawArchive
+from proxy_pool import ProxyPool
+from identity_pool import IdentityPool
+from rate_limiter import shared_limiter
+
+# 每个解析进程各自持有一个解析器
+_scraper = None
+
+def _init_worker():
+    """子进程初始化"""
+    global _scraper
+    _scraper = WeiboScraper()
+
+def _parse_page(raw, scraped_at):
+    """在子进程中解析一页微博列表，返回 (微博列表, 是否没有更多数据)"""
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        # 被重定向到验证页等情况返回的不是JSON
+        return [], True
+    if data.get('ok') != 1:
+        return [], True
+    cards = data.get('data', {}).get('cards', [])
+    if not cards:
+        return [], True
+
+    weibos = []
+    for card in cards:
+        if card.get('card_type') == 9 and card.get('mblog'):
+            weibo = _scraper.parse_weibo_data(card['mblog'], scraped_at)
+            if weibo:
+                weibos.append(weibo)
+    return weibos, False
+
+class ScrapePipeline(BatchWeiboScraper):
+    def __init__(self, proxy_pool=None, identity_pool=None, archive=None, fetch_workers=None, parse_workers=None,
+                 save_format=None):
+        super().__init__(proxy_pool=proxy_pool, identity_pool=identity_pool, archive=archive)
+        self.fetch_workers = fetch_workers or PIPELINE_CONFIG['fetch_workers']
+        self.parse_workers = parse_workers or PIPELINE_CONFIG['parse_workers'] or os.cpu_count()
+        self.save_format = save_format
+        # 使用代理池或身份池时由各自的速率限制控制请求间隔
+        self.limiter = None if self.scraper.page_delay == 0 else shared_limiter()
+        # 已请求、尚未解析完的页数上限
+        self.pending_pages = threading.BoundedSemaphore(PIPELINE_CONFIG['max_pending_pages'])
+        # 已抓取完、等待写出的用户数上限
+        self.write_queue = queue.Queue(maxsize=PIPELINE_CONFIG['write_queue_size'])
+        self.logger = logging.getLogger(__name__)
+
+    def _release_page(self, future):
+        self.pending_pages.release()
+
+    def _fetch_user(self, uid, max_pages, executor):
+        """请求一个用户的所有列表页，每页提交给进程池解析，结果交给写入线程"""
+        user_info = self.scraper.get_user_info(uid)
+        futures = []
+        if user_info:
+            containerid = f'107603{uid}'
+            scraped_at = datetime.now(CST)
+            for page in range(1, max_pages + 1):
+                # 不等当前页解析完就请求下一页，最多领先一页：前一页已确认没有更多数据时停止
+                if len(futures) >= 2 and futures[-2].result()[1]:
+                    break
+                if self.limiter:
+                    self.limiter.acquire()
+                self.pending_pages.acquire()
+                try:
+                    response = self.scraper.fetch("https://m.weibo.cn/api/container/getIndex", {
+                        'type': 'uid', 'value': uid, 'containerid': containerid, 'page': page})
+                    response.raise_for_status()
+                except Exception as e:
+                    self.pending_pages.release()
+                    self.logger.error(f"抓取用户 {uid} 第 {page} 页失败: {e}")
+                    continue
+                if self.scraper.archive:
+                    self.scraper.archive.append(response.content, uid, page, containerid)
+
+                future = executor.submit(_parse_page, response.content, scraped_at)
+                future.add_done_callback(self._release_page)
+                futures.append(future)
+        # 写入线程处理不过来时在这里等待
+        self.write_queue.put((uid, user_info, futures))
+
+    def _write_user(self, uid, user_info, futures):
+        """按页序写出一个用户的解析结果，返回与 scrape_one_user 相同格式的结果记录"""
+        if not user_info:
+            print(f"❌ 抓取用户 {uid} 失败")
+            return {'success': False, 'error': 'Failed to get user info', 'scrape_time': datetime.now().isoformat()}
+
+        output_dir = f"weibo_data_{uid}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        output = None
+        for future in futures:
+            weibos, done = future.result()
+            if weibos and output is None:
+                output = StreamOutput(output_dir, self.save_format)
+            for weibo in weibos:
+                output.write(weibo)
+            if done:
+                break
+
+        if output is None:
+            print(f"❌ 抓取用户 {uid} 失败")
+            return {'success': False, 'error': 'No weibos', 'scrape_time': datetime.now().isoformat()}
+
+        output.close()
+        with open(os.path.join(output_dir, 'user_info.json'), 'w', encoding='utf-8') as f:
+            json.dump(user_info, f, ensure_ascii=False, indent=2)
+        print(f"✅ 成功抓取用户 {user_info['screen_name']}")
+        return {
+            'success': True,
+            'user_info': user_info,
+            'weibo_count': output.count,
+            'output_dir': output_dir,
+            'scrape_time': datetime.now().isoformat()
+        }
+
+    def _writer(self, results):
+        """写入线程：依次写出抓取完的用户"""
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                break
+            uid, user_info, futures = item
+            try:
+                results[uid] = self._write_user(uid, user_info, futures)
+            except Exception as e:
+                print(f"❌ 写出用户 {uid} 的数据出现异常: {e}")
+                results[uid] = {'success': False, 'error': str(e), 'scrape_time': datetime.now().isoformat()}
+
+    def run(self, user_list, max_pages=5):
+        """用流水线抓取所有用户，返回 {UID: 结果记录}"""
+        results = {}
+        print(f"流水线模式：{self.fetch_workers} 个抓取线程，{self.parse_workers} 个解析进程")
+        # 先创建进程池再启动线程
+        with ProcessPoolExecutor(max_workers=self.parse_workers, initializer=_init_worker) as parse_pool:
+            writer = threading.Thread(target=self._writer, args=(results,), name='pipeline-writer')
+            writer.start()
+            try:
+                with ThreadPoolExecutor(max_workers=self.fetch_workers) as fetch_pool:
+                    futures = [fetch_pool.submit(self._fetch_user, uid, max_pages, parse_pool) for uid in user_list]
+                    for future in futures:
+                        future.result()
+            finally:
+                self.write_queue.put(None)
+                writer.join()
+        return {uid: results[uid] for uid in user_list if uid in results}
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='微博批量抓取（多进程流水线）')
+    parser.add_argument('user_list', help='用户列表文件（每行一个UID，或JSON列表）')
+    parser.add_argument('--pages', type=int, default=5, help='每个用户抓取页数')
+    parser.add_argument('--fetch-workers', type=int, default=PIPELINE_CONFIG['fetch_workers'], help='抓取线程数')
+    parser.add_argument('--parse-workers', type=int, default=PIPELINE_CONFIG['parse_workers'], help='解析进程数，默认CPU核数')
+    parser.add_argument('--format', choices=['csv', 'json', 'both', 'jsonl'], help='输出格式，默认按 OUTPUT_CONFIG')
+    args = parser.parse_args()
+
+    user_list = BatchWeiboScraper.load_user_list(args.user_list)
+    if not user_list:
+        print("用户列表为空")
+        return
+
+    proxy_pool = ProxyPool.from_config()
+    identity_pool = IdentityPool(size=args.fetch_workers, proxy_pool=proxy_pool) if args.fetch_workers > 1 else None
+    archive = RawArchive() if ARCHIVE_CONFIG['enabled'] else None
+    pipeline = ScrapePipeline(proxy_pool=proxy_pool, identity_pool=identity_pool, archive=archive,
+                              fetch_workers=args.fetch_workers, parse_workers=args.parse_workers,
+                              save_format=args.format)
+    results = pipeline.run(user_list, args.pages)
+    pipeline.save_batch_results(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词微博搜索
+按关键词或话题并发翻页搜索微博，结果用 WeiboScraper.parse_weibo_data 解析，
+与用户微博的数据格式一致，按微博ID跨关键词去重后逐条写入输出文件
+"""
+
+import os
+import json
+import logging
+import threading
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import SEARCH_CONFIG
+from weibo_scraper import WeiboScraper
+from output_writer import StreamOutput
+from proxy_pool import ProxyPool
+from identity_pool import IdentityPool
+from rate_limiter import shared_limiter
+
+def extract_search_mblogs(cards):
+    """从搜索结果卡片中提取微博，微博卡片(card_type=9)可能嵌套在 card_group 中"""
+    mblogs = []
+    for card in cards:
+        for item in card.get('card_group') or [card]:
+            if item.get('card_type') == 9 and item.get('mblog'):
+                mblogs.append(item['mblog'])
+    return mblogs
+
+class PostSearchCrawler:
+    def __init__(self, scraper=None, max_pages=None, max_workers=None, limiter=None):
+        self.scraper = scraper or WeiboScraper()
+        # 使用代理池或身份池时由各自的速率限制控制请求间隔
+        self.limiter = limiter or (None if self.scraper.page_delay == 0 else shared_limiter())
+        self.max_pages = max_pages or SEARCH_CONFIG['max_pages']
+        self.max_workers = max_workers or SEARCH_CONFIG['max_workers']
+        self.search_type = SEARCH_CONFIG['post_search_type']
+        self.seen_ids = set()
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def fetch_search_page(self, keyword, page=1):
+        """请求一页微博搜索结果，返回原始微博列表，请求失败时抛出异常"""
+        params = {
+            'containerid': f'100103type={self.search_type}&q={keyword}',
+            'page_type': 'searchall',
+            'page': page,
+        }
+        if self.limiter:
+            self.limiter.acquire()
+        response = self.scraper.fetch("https://m.weibo.cn/api/container/getIndex", params)
+        response.raise_for_status()
+        data = response.json()
+        if data.get('ok') != 1:
+            # 超出最后一页时接口同样返回 ok=0
+            return []
+        return extract_search_mblogs(data.get('data', {}).get('cards', []))
+
+    def _search_keyword(self, keyword, output):
+        """翻页搜索单个关键词，返回新增的微博数"""
+        found = 0
+        for page in range(1, self.max_pages + 1):
+            mblogs = self.fetch_search_page(keyword, page)
+            if not mblogs:
+                break
+
+            for mblog in mblogs:
+                mblog_id = mblog.get('id')
+                # 先占用ID再解析，其他关键词的线程不会重复解析同一条微博
+                with self.lock:
+                    if not mblog_id or mblog_id in self.seen_ids:
+                        continue
+                    self.seen_ids.add(mblog_id)
+                weibo = self.scraper.parse_weibo_data(mblog)
+                if weibo:
+                    weibo['keyword'] = keyword
+                    output.write(weibo)
+                    found += 1
+        return found
+
+    def search(self, keywords, output_dir, save_format=None):
+        """搜索所有关键词，结果写入 output_dir，返回 {关键词: 新增微博数}"""
+        keywords = list(dict.fromkeys(k.strip() for k in keywords if k.strip()))
+        print(f"共 {len(keywords)} 个关键词，每个最多 {self.max_pages} 页")
+
+        summary = {}
+        with StreamOutput(output_dir, save_format) as output:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(self._search_keyword, k, output): k for k in keywords}
+                for done, future in enumerate(as_completed(futures), 1):
+                    keyword = futures[future]
+                    try:
+                        summary[keyword] = future.result()
+                        self.logger.info(f"[{done}/{len(keywords)}] {keyword}: 新增 {summary[keyword]} 条微博")
+                    except Exception as e:
+                        summary[keyword] = None
+                        self.logger.error(f"[{done}/{len(keywords)}] {keyword}: 搜索失败: {e}")
+
+        with open(os.path.join(output_dir, 'search_summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"搜索完成，共 {output.count} 条不重复微博，已保存到 {', '.join(output.files)}")
+        return summary
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='微博关键词搜索')
+    parser.add_argument('keywords', nargs='?', help='关键词文件（每行一个关键词或 #话题#），不指定时手动输入')
+    parser.add_argument('--pages', type=int, default=SEARCH_CONFIG['max_pages'], help='每个关键词最多翻页数')
+    parser.add_argument('--workers', type=int, default=SEARCH_CONFIG['max_workers'], help='并发线程数')
+    parser.add_argument('--format', choices=['csv', 'json', 'both', 'jsonl'], help='输出格式，默认按 OUTPUT_CONFIG')
+    args = parser.parse_args()
+
+    if args.keywords:
+        with open(args.keywords, 'r', encoding='utf-8') as f:
+            keywords = [line.strip() for line in f if line.strip()]
+    else:
+        print("请输入关键词，每行一个，输入空行结束:")
+        keywords = []
+        while True:
+            keyword = input().strip()
+            if not keyword:
+                break
+            keywords.append(keyword)
+
+    if not keywords:
+        print("关键词列表为空")
+        return
+
+    proxy_pool = ProxyPool.from_config()
+    identity_pool = IdentityPool(size=args.workers, proxy_pool=proxy_pool) if args.workers > 1 else None
+    crawler = PostSearchCrawler(WeiboScraper(proxy_pool=proxy_pool, identity_pool=identity_pool),
+                                max_pages=args.pages, max_workers=args.workers)
+    output_dir = f"weibo_search_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    crawler.search(keywords, output_dir, args.format)
+
+if __name__ == "__main__":
+    main()
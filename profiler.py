@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取过程性能分析
+按阶段（网络请求、等待、JSON解码、解析、DataFrame构建、序列化等）统计耗时和内存峰值，
+并保存cProfile结果，未开启时各阶段的统计调用几乎没有开销
+"""
+
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# 未开启性能分析时所有阶段共用同一个空上下文
+_NULL_PHASE = nullcontext()
+
+class NullProfiler:
+    """未开启性能分析时使用的空实现"""
+    enabled = False
+
+    def phase(self, name):
+        return _NULL_PHASE
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def save(self, output_dir):
+        return None
+
+class RunProfiler:
+    """按阶段统计墙钟时间、CPU时间和内存峰值"""
+    enabled = True
+
+    def __init__(self, top_n=30):
+        self.top_n = top_n
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.profile = cProfile.Profile()
+        self.started_at = None
+        self.total_wall = 0.0
+        self.total_cpu = 0.0
+
+    def start(self):
+        """开始分析（cProfile只统计调用 start 的线程）"""
+        tracemalloc.start()
+        self.started_at = (time.perf_counter(), time.process_time())
+        self.profile.enable()
+
+    def stop(self):
+        """结束分析"""
+        self.profile.disable()
+        if self.started_at:
+            self.total_wall = time.perf_counter() - self.started_at[0]
+            self.total_cpu = time.process_time() - self.started_at[1]
+        if tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name):
+        """统计一个阶段，可嵌套；内存峰值为该阶段内相对进入时的增量"""
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # 重置前把目前的峰值记到外层阶段
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+        else:
+            current = 0
+        frame = [current, 0]
+        stack.append(frame)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            stack.pop()
+            peak = 0
+            if tracing and tracemalloc.is_tracing():
+                peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+            with self.lock:
+                stat = self.stats.setdefault(name, {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_memory': 0})
+                stat['count'] += 1
+                stat['wall'] += wall
+                stat['cpu'] += cpu
+                stat['peak_memory'] = max(stat['peak_memory'], peak - frame[0])
+
+    def report(self):
+        """阶段统计报告"""
+        with self.lock:
+            phases = {name: dict(stat) for name, stat in self.stats.items()}
+        for stat in phases.values():
+            stat['wall'] = round(stat['wall'], 4)
+            stat['cpu'] = round(stat['cpu'], 4)
+            stat['wall_percent'] = round(stat['wall'] / self.total_wall * 100, 1) if self.total_wall else None
+        return {
+            'total_wall': round(self.total_wall, 4),
+            'total_cpu': round(self.total_cpu, 4),
+            'peak_memory': getattr(self, 'peak_memory', None),
+            'phases': dict(sorted(phases.items(), key=lambda item: -item[1]['wall'])),
+        }
+
+    def save(self, output_dir):
+        """保存阶段报告、cProfile结果和热点函数列表，返回报告文件路径"""
+        os.makedirs(output_dir, exist_ok=True)
+        report = self.report()
+
+        report_file = os.path.join(output_dir, 'profile_phases.json')
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        self.profile.dump_stats(os.path.join(output_dir, 'profile.prof'))
+        buffer = io.StringIO()
+        pstats.Stats(self.profile, stream=buffer).sort_stats('cumulative').print_stats(self.top_n)
+        with open(os.path.join(output_dir, 'profile_top.txt'), 'w', encoding='utf-8') as f:
+            f.write(buffer.getvalue())
+
+        print("\n=== 性能分析 ===")
+        print(f"总耗时: {report['total_wall']:.2f} 秒，CPU: {report['total_cpu']:.2f} 秒")
+        for name, stat in report['phases'].items():
+            print(f"  {name:<16} 次数 {stat['count']:<6} 耗时 {stat['wall']:>9.3f} 秒 "
+                  f"CPU {stat['cpu']:>8.3f} 秒 内存峰值 {stat['peak_memory'] / 1024 / 1024:>7.2f} MB")
+        print(f"性能分析结果已保存到: {output_dir}")
+        return report_file
+
+def create_profiler(enabled):
+    """根据 --profile 选项创建分析器"""
+    return RunProfiler() if enabled else NullProfiler()
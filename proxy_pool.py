@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+代理池
+在多个代理之间轮换请求，记录每个代理的延迟和失败/限流情况，
+剔除异常代理并定期重新探测，每个代理有独立的请求速率限制
+"""
+
+import os
+import time
+import logging
+import threading
+import requests
+from config import PROXY_CONFIG
+from rate_limiter import RateLimiter
+
+# 微博限流时返回的状态码
+THROTTLE_STATUS_CODES = (403, 418, 429)
+
+class ProxyState:
+    """单个代理的健康状态"""
+
+    def __init__(self, url, rate, burst):
+        self.url = url
+        self.limiter = RateLimiter(rate, burst)
+        self.latency = None  # 延迟滑动平均（秒）
+        self.requests = 0
+        self.failures = 0
+        self.throttles = 0
+        self.consecutive_failures = 0
+        self.evictions = 0
+        self.evicted_until = 0
+        self.probing = False
+
+    @property
+    def healthy(self):
+        return self.evicted_until == 0
+
+    def score(self):
+        """得分越低越优先：延迟乘以失败和限流惩罚"""
+        if not self.requests:
+            return 0.0
+        failure_rate = self.failures / self.requests
+        throttle_rate = self.throttles / self.requests
+        return (self.latency or 1.0) * (1 + 4 * failure_rate + 8 * throttle_rate)
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'latency': round(self.latency, 3) if self.latency is not None else None,
+            'requests': self.requests,
+            'failures': self.failures,
+            'throttles': self.throttles,
+            'evictions': self.evictions,
+        }
+
+class ProxyPool:
+    def __init__(self, proxies, requests_per_second=None, burst=None):
+        if not proxies:
+            raise ValueError("代理列表不能为空")
+        rate = requests_per_second or PROXY_CONFIG['requests_per_second']
+        burst = burst or PROXY_CONFIG['burst']
+        self.proxies = [ProxyState(url, rate, burst) for url in dict.fromkeys(proxies)]
+        self.max_failures = PROXY_CONFIG['max_failures']
+        self.eviction_seconds = PROXY_CONFIG['eviction_seconds']
+        self.max_eviction_seconds = PROXY_CONFIG['max_eviction_seconds']
+        self.probe_url = PROXY_CONFIG['probe_url']
+        self.probe_timeout = PROXY_CONFIG['probe_timeout']
+        self.alpha = PROXY_CONFIG['latency_alpha']
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_file(cls, file_path, **kwargs):
+        """从文件加载代理列表，每行一个，#开头的行为注释"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            proxies = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        return cls(proxies, **kwargs)
+
+    @classmethod
+    def from_config(cls):
+        """按 config.PROXY_CONFIG 创建代理池，没有配置代理时返回None"""
+        proxies = list(PROXY_CONFIG['proxies'])
+        proxy_file = PROXY_CONFIG['proxy_file']
+        if proxy_file and os.path.exists(proxy_file):
+            with open(proxy_file, 'r', encoding='utf-8') as f:
+                proxies += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        return cls(proxies) if proxies else None
+
+    def _due_for_probe(self, now):
+        """取出一个剔除期已过、等待探测的代理"""
+        with self.lock:
+            for proxy in self.proxies:
+                if not proxy.healthy and not proxy.probing and now >= proxy.evicted_until:
+                    proxy.probing = True
+                    return proxy
+        return None
+
+    def probe(self, proxy):
+        """探测被剔除的代理，成功则恢复使用"""
+        start = time.monotonic()
+        try:
+            response = requests.get(self.probe_url, proxies={'http': proxy.url, 'https': proxy.url},
+                                    timeout=self.probe_timeout)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        latency = time.monotonic() - start
+
+        with self.lock:
+            proxy.probing = False
+            if ok:
+                proxy.evicted_until = 0
+                proxy.consecutive_failures = 0
+                proxy.latency = latency
+                self.logger.info(f"代理 {proxy.url} 探测成功，恢复使用")
+            else:
+                self._evict(proxy)
+        return ok
+
+    def _evict(self, proxy):
+        """剔除代理，连续剔除时等待时间翻倍（调用方需持有锁）"""
+        proxy.evictions += 1
+        wait = min(self.eviction_seconds * 2 ** (proxy.evictions - 1), self.max_eviction_seconds)
+        proxy.evicted_until = time.monotonic() + wait
+        self.logger.warning(f"代理 {proxy.url} 已剔除，{wait:.0f} 秒后重新探测")
+
+    def acquire(self):
+        """获取一个可用代理，所有代理的请求额度都用完时阻塞等待"""
+        while True:
+            now = time.monotonic()
+            proxy = self._due_for_probe(now)
+            if proxy:
+                self.probe(proxy)
+                continue
+
+            with self.lock:
+                healthy = sorted((p for p in self.proxies if p.healthy), key=lambda p: p.score())
+            if not healthy:
+                with self.lock:
+                    next_probe = min(p.evicted_until for p in self.proxies)
+                self.logger.warning("没有可用代理，等待重新探测")
+                time.sleep(max(0.1, next_probe - time.monotonic()))
+                continue
+
+            for proxy in healthy:
+                if proxy.limiter.try_acquire():
+                    return proxy
+            time.sleep(min(p.limiter.wait_time() for p in healthy))
+
+    def report(self, proxy, latency, ok=True, throttled=False):
+        """记录一次请求结果"""
+        with self.lock:
+            proxy.requests += 1
+            if latency is not None:
+                proxy.latency = latency if proxy.latency is None else \
+                    self.alpha * latency + (1 - self.alpha) * proxy.latency
+            if throttled:
+                proxy.throttles += 1
+            elif not ok:
+                proxy.failures += 1
+            if not ok or throttled:
+                proxy.consecutive_failures += 1
+                if proxy.healthy and (throttled or proxy.consecutive_failures >= self.max_failures):
+                    self._evict(proxy)
+            else:
+                proxy.consecutive_failures = 0
+                proxy.evictions = 0
+
+    def healthy_count(self):
+        with self.lock:
+            return sum(1 for p in self.proxies if p.healthy)
+
+    def stats(self):
+        """所有代理的状态"""
+        with self.lock:
+            return [p.to_dict() for p in self.proxies]
+
+    def session(self):
+        """创建通过代理池发送请求的Session"""
+        return ProxiedSession(self)
+
+class ProxiedSession(requests.Session):
+    """每个请求都从代理池中选择代理，并把结果反馈给代理池"""
+
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+
+    def request(self, method, url, **kwargs):
+        proxy = self.pool.acquire()
+        kwargs['proxies'] = {'http': proxy.url, 'https': proxy.url}
+        kwargs.setdefault('timeout', self.pool.probe_timeout * 2)
+        start = time.monotonic()
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.RequestException:
+            self.pool.report(proxy, None, ok=False)
+            raise
+        throttled = response.status_code in THROTTLE_STATUS_CODES
+        self.pool.report(proxy, time.monotonic() - start, ok=response.status_code < 500, throttled=throttled)
+        return response
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求速率限制工具
+基于令牌桶算法，多线程共享同一个限速器
+"""
+
+import time
+import threading
+from config import RATE_LIMIT_CONFIG
+
+class RateLimiter:
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate or RATE_LIMIT_CONFIG['requests_per_second']
+        self.burst = burst or RATE_LIMIT_CONFIG['burst']
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        """按经过的时间补充令牌（调用方需持有锁）"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """尝试获取一个令牌，不阻塞"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def wait_time(self):
+        """距离下一个可用令牌的秒数"""
+        with self.lock:
+            self._refill()
+            return max(0.0, (1 - self.tokens) / self.rate)
+
+    def acquire(self):
+        """获取一个令牌，令牌不足时阻塞等待"""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+def shared_limiter():
+    """获取进程内共享的限速器，所有访问微博接口的模块应使用同一个"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
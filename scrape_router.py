@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口优先的批量抓取
+所有用户先用 WeiboScraper 通过接口抓取，只有接口返回失败、被重定向到游客验证页、
+或用户有微博但返回的卡片为空的用户才改用浏览器（WeiboSeleniumScraper）抓取，
+两种方式的结果合并到同一份报告
+"""
+
+import queue
+import argparse
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from config import ROUTER_CONFIG
+from batch_scraper import BatchWeiboScraper
+from weibo_selenium_scraper import WeiboSeleniumScraper
+from proxy_pool import ProxyPool
+from identity_pool import IdentityPool
+
+# 这些失败原因说明接口对该用户不可用，浏览器可能可以抓到；网络错误（error）和限流（throttled）不在其中
+ESCALATE_FAILURES = ('api_not_ok', 'visitor_wall', 'empty_cards')
+
+class BrowserPool:
+    """复用浏览器实例，第一次需要时才启动，最多同时打开 size 个"""
+
+    def __init__(self, size=None, headless=None):
+        self.size = size or ROUTER_CONFIG['browser_pool_size']
+        self.headless = ROUTER_CONFIG['headless'] if headless is None else headless
+        self.idle = queue.Queue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def scraper(self):
+        """借出一个浏览器，用完后归还"""
+        try:
+            browser = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                create = self.created < self.size
+                if create:
+                    self.created += 1
+            if create:
+                try:
+                    browser = WeiboSeleniumScraper(headless=self.headless)
+                except Exception:
+                    with self.lock:
+                        self.created -= 1
+                    raise
+            else:
+                browser = self.idle.get()
+        try:
+            yield browser
+        finally:
+            self.idle.put(browser)
+
+    def close(self):
+        """关闭所有浏览器"""
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self.created = 0
+
+class ScrapeRouter(BatchWeiboScraper):
+    def __init__(self, proxy_pool=None, identity_pool=None, archive=None, profiler=None, dedup=None,
+                 browser_pool=None):
+        super().__init__(proxy_pool=proxy_pool, identity_pool=identity_pool, archive=archive, profiler=profiler,
+                         dedup=dedup)
+        self.browser_pool = browser_pool or BrowserPool()
+
+    def scrape_with_browser(self, uid, max_scrolls):
+        """用浏览器抓取单个用户，返回与 scrape_one_user 相同格式的结果记录"""
+        try:
+            with self.browser_pool.scraper() as browser:
+                result = browser.scrape_user_weibos(uid, max_scrolls)
+                if not result or not result['weibos']:
+                    print(f"❌ 浏览器抓取用户 {uid} 失败")
+                    return {
+                        'success': False,
+                        'error': 'Failed to scrape with browser',
+                        'scrape_time': datetime.now().isoformat()
+                    }
+                output_dir = browser.save_data(
+                    result, f"weibo_selenium_data_{uid}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+            if self.dedup:
+                # 与接口抓取一样记录已保存的微博，下次运行时跳过
+                self.dedup.mark_seen(weibo['id'] for weibo in result['weibos'])
+
+            user_info = result['user_info']
+            print(f"✅ 浏览器成功抓取用户 {user_info['screen_name']}")
+            return {
+                'success': True,
+                'user_info': user_info,
+                'weibo_count': len(result['weibos']),
+                'output_dir': output_dir,
+                'scrape_time': datetime.now().isoformat()
+            }
+        except Exception as e:
+            print(f"❌ 浏览器抓取用户 {uid} 出现异常: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'scrape_time': datetime.now().isoformat()
+            }
+
+    def route(self, user_list, max_pages=5, delay=10, workers=1, max_scrolls=None):
+        """先用接口抓取所有用户，再用浏览器重试接口不可用的用户，返回合并后的结果"""
+        results = self.scrape_multiple_users(user_list, max_pages, delay, workers)
+        for record in results.values():
+            record['route'] = 'api'
+
+        escalated = [uid for uid, record in results.items()
+                     if not record['success'] and record.get('failure') in ESCALATE_FAILURES]
+        if not escalated:
+            return results
+
+        print(f"\n{len(escalated)}/{len(results)} 个用户接口抓取失败，改用浏览器抓取")
+        # 每次滚动大约加载一页微博
+        max_scrolls = max_scrolls or max_pages
+        try:
+            with ThreadPoolExecutor(max_workers=self.browser_pool.size) as executor:
+                records = executor.map(lambda uid: self.scrape_with_browser(uid, max_scrolls), escalated)
+                for uid, record in zip(escalated, records):
+                    record['route'] = 'selenium'
+                    record['api_failure'] = results[uid]['failure']
+                    results[uid] = record
+        finally:
+            self.browser_pool.close()
+        return results
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='微博批量抓取（接口优先，失败时改用浏览器）')
+    parser.add_argument('user_list', help='用户列表文件（每行一个UID，或JSON列表）')
+    parser.add_argument('--pages', type=int, default=5, help='每个用户抓取页数')
+    parser.add_argument('--delay', type=int, default=10, help='单线程抓取时用户间延时秒数')
+    parser.add_argument('--workers', type=int, default=1, help='接口抓取的并发线程数')
+    parser.add_argument('--browsers', type=int, default=ROUTER_CONFIG['browser_pool_size'], help='最多同时打开的浏览器数')
+    args = parser.parse_args()
+
+    user_list = BatchWeiboScraper.load_user_list(args.user_list)
+    if not user_list:
+        print("用户列表为空")
+        return
+
+    proxy_pool = ProxyPool.from_config()
+    identity_pool = IdentityPool(size=args.workers, proxy_pool=proxy_pool) if args.workers > 1 else None
+    router = ScrapeRouter(proxy_pool=proxy_pool, identity_pool=identity_pool,
+                          browser_pool=BrowserPool(size=args.browsers))
+    results = router.route(user_list, args.pages, args.delay, args.workers)
+
+    api_count = sum(1 for r in results.values() if r['success'] and r['route'] == 'api')
+    browser_count = sum(1 for r in results.values() if r['success'] and r['route'] == 'selenium')
+    print(f"接口抓取成功 {api_count} 个用户，浏览器抓取成功 {browser_count} 个用户")
+    router.save_batch_results(results)
+
+if __name__ == "__main__":
+    main()
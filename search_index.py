@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+微博全文检索
+用SQLite FTS5建立倒排索引，中文按相邻两字切分（二元分词）后写入索引，
+支持增量更新，查询时可按用户、时间范围和互动数过滤
+"""
+
+import os
+import re
+import glob
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from config import SEARCH_INDEX_CONFIG
+from weibo_scraper import CST, parse_time_bound
+from output_reader import iter_records, find_output_file
+
+CJK_PATTERN = re.compile(r'([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)')
+# FTS5 查询语法中有特殊含义的字符，查询词中的这些字符按分隔符处理
+QUERY_STRIP_PATTERN = re.compile(r'["*^():+\-]')
+OUTPUT_DIR_PATTERNS = ('weibo_data_*', 'weibo_search_*', 'weibo_selenium_data_*')
+
+def tokenize(text, for_query=False):
+    """把文本转换为空格分隔的词：中文连续字符切成相邻两字，其余部分交给FTS5按单词切分；
+    建索引时每段中文末尾再加上最后一个字，保证任意单字都是某个词的开头，可以用前缀查询"""
+    tokens = []
+    for i, part in enumerate(CJK_PATTERN.split(text or '')):
+        if i % 2 == 0:
+            if part.strip():
+                tokens.append(part.strip().lower())
+        elif len(part) == 1:
+            tokens.append(part)
+        else:
+            tokens.extend(part[j:j + 2] for j in range(len(part) - 1))
+            if not for_query:
+                tokens.append(part[-1])
+    return ' '.join(tokens)
+
+def build_match_query(query):
+    """把查询字符串转换为FTS5查询：空格分隔的每个词都必须出现，中文按连续的两字短语匹配"""
+    clauses = []
+    for term in QUERY_STRIP_PATTERN.sub(' ', query).split():
+        tokens = tokenize(term, for_query=True).split()
+        if not tokens:
+            continue
+        if len(tokens) == 1 and CJK_PATTERN.fullmatch(tokens[0]) and len(tokens[0]) == 1:
+            # 单个汉字：匹配以该字开头的词
+            clauses.append(f'"{tokens[0]}"*')
+        else:
+            clauses.append('"' + ' '.join(tokens) + '"')
+    if not clauses:
+        raise ValueError("查询词为空")
+    return ' AND '.join(clauses)
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+class SearchIndex:
+    def __init__(self, db_file=None):
+        self.db_file = db_file or SEARCH_INDEX_CONFIG['db_file']
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY,
+                user_id TEXT,
+                user_name TEXT,
+                created_timestamp INTEGER,
+                attitudes_count INTEGER,
+                reposts_count INTEGER,
+                comments_count INTEGER,
+                engagement INTEGER,
+                text TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_posts_user_time ON posts (user_id, created_timestamp);
+            CREATE INDEX IF NOT EXISTS idx_posts_time ON posts (created_timestamp);
+            CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5 (tokens, content='', tokenize='unicode61');
+            CREATE TABLE IF NOT EXISTS indexed_files (path TEXT PRIMARY KEY, mtime REAL, size INTEGER);
+        """)
+
+    def add_weibos(self, weibos):
+        """把微博记录（parse_weibo_data 的输出）加入索引，返回新增条数；
+        已索引的微博只更新互动数"""
+        added = 0
+        with self.lock, self.conn:
+            for weibo in weibos:
+                mblog_id = _to_int(weibo.get('id'))
+                if not mblog_id:
+                    continue
+                counts = [_to_int(weibo.get(key)) for key in ('attitudes_count', 'reposts_count', 'comments_count')]
+                exists = self.conn.execute('SELECT 1 FROM posts WHERE id = ?', (mblog_id,)).fetchone()
+                if exists:
+                    self.conn.execute('UPDATE posts SET attitudes_count = ?, reposts_count = ?, comments_count = ?, '
+                                      'engagement = ? WHERE id = ?', (*counts, sum(counts), mblog_id))
+                    continue
+
+                retweeted = weibo.get('retweeted_status')
+                retweeted_text = retweeted.get('text', '') if isinstance(retweeted, dict) else ''
+                tokens = ' '.join(tokenize(text) for text in
+                                  (weibo.get('text'), weibo.get('text_raw'), retweeted_text) if text)
+                self.conn.execute('INSERT INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                    mblog_id, str(weibo.get('user_id') or ''), weibo.get('user_name', ''),
+                    weibo.get('created_timestamp'), *counts, sum(counts), weibo.get('text', '')))
+                self.conn.execute('INSERT INTO posts_fts (rowid, tokens) VALUES (?, ?)', (mblog_id, tokens))
+                added += 1
+        return added
+
+    def index_file(self, json_file):
+        """索引一个 weibos.json/weibos.jsonl 文件（可以是压缩文件），文件未变化时跳过，返回新增条数"""
+        stat = os.stat(json_file)
+        path = os.path.abspath(json_file)
+        with self.lock:
+            row = self.conn.execute('SELECT mtime, size FROM indexed_files WHERE path = ?', (path,)).fetchone()
+        if row and row[0] == stat.st_mtime and row[1] == stat.st_size:
+            return 0
+
+        added = self.add_weibos(iter_records(json_file))
+        with self.lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO indexed_files VALUES (?, ?, ?)',
+                              (path, stat.st_mtime, stat.st_size))
+        return added
+
+    def index_dirs(self, root='.'):
+        """增量索引 root 下所有抓取输出目录，返回 (处理的文件数, 新增条数)"""
+        output_dirs = {d for pattern in OUTPUT_DIR_PATTERNS for d in glob.glob(os.path.join(root, pattern))}
+        files = sorted(filter(None, (find_output_file(d) for d in output_dirs)))
+        added = 0
+        for json_file in files:
+            added += self.index_file(json_file)
+        return len(files), added
+
+    def search(self, query, uid=None, since=None, until=None, min_engagement=None, min_attitudes=None,
+               min_reposts=None, min_comments=None, order='time', limit=20):
+        """全文检索，since/until 为时间或"YYYY-MM-DD"字符串，order 为 time（最新在前）或 engagement"""
+        conditions = ['posts_fts MATCH ?']
+        params = [build_match_query(query)]
+        if uid:
+            conditions.append('posts.user_id = ?')
+            params.append(str(uid))
+        since_ts = parse_time_bound(since)
+        if since_ts is not None:
+            conditions.append('posts.created_timestamp >= ?')
+            params.append(since_ts)
+        until_ts = parse_time_bound(until)
+        if until_ts is not None:
+            conditions.append('posts.created_timestamp <= ?')
+            params.append(until_ts)
+        for column, value in (('engagement', min_engagement), ('attitudes_count', min_attitudes),
+                              ('reposts_count', min_reposts), ('comments_count', min_comments)):
+            if value is not None:
+                conditions.append(f'posts.{column} >= ?')
+                params.append(value)
+
+        # 微博ID随发布时间递增，按rowid倒序时FTS5可以边匹配边返回，不需要先取出全部结果再排序
+        order_by = 'posts.engagement DESC' if order == 'engagement' else 'posts_fts.rowid DESC'
+        sql = (f'SELECT posts.* FROM posts_fts JOIN posts ON posts.id = posts_fts.rowid '
+               f'WHERE {" AND ".join(conditions)} ORDER BY {order_by} LIMIT ?')
+        params.append(limit)
+        with self.lock:
+            cursor = self.conn.execute(sql, params)
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='微博全文检索')
+    parser.add_argument('--db', default=SEARCH_INDEX_CONFIG['db_file'], help='索引文件')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='增量索引抓取输出目录')
+    build_parser.add_argument('--root', default='.', help='包含 weibo_data_* 等输出目录的目录')
+
+    query_parser = subparsers.add_parser('query', help='检索')
+    query_parser.add_argument('query', help='查询词，多个词用空格分隔，需同时出现')
+    query_parser.add_argument('--uid', help='只检索该用户的微博')
+    query_parser.add_argument('--since', help='起始时间，如 2024-01-01')
+    query_parser.add_argument('--until', help='结束时间')
+    query_parser.add_argument('--min-engagement', type=int, help='最少互动数（点赞+转发+评论）')
+    query_parser.add_argument('--min-attitudes', type=int, help='最少点赞数')
+    query_parser.add_argument('--min-reposts', type=int, help='最少转发数')
+    query_parser.add_argument('--min-comments', type=int, help='最少评论数')
+    query_parser.add_argument('--order', choices=['time', 'engagement'], default='time', help='排序方式')
+    query_parser.add_argument('--limit', type=int, default=20, help='最多返回条数')
+    args = parser.parse_args()
+
+    index = SearchIndex(args.db)
+    if args.command == 'build':
+        files, added = index.index_dirs(args.root)
+        print(f"处理 {files} 个文件，新增 {added} 条微博，索引中共 {index.count()} 条")
+    else:
+        results = index.search(args.query, uid=args.uid, since=args.since, until=args.until,
+                               min_engagement=args.min_engagement, min_attitudes=args.min_attitudes,
+                               min_reposts=args.min_reposts, min_comments=args.min_comments,
+                               order=args.order, limit=args.limit)
+        for post in results:
+            created = (datetime.fromtimestamp(post['created_timestamp'], CST).strftime('%Y-%m-%d %H:%M')
+                       if post['created_timestamp'] else '')
+            text = post['text'].replace('\n', ' ')
+            print(f"[{created}] {post['user_name']}({post['user_id']}) 互动 {post['engagement']}  "
+                  f"{text[:80]}  (ID {post['id']})")
+        print(f"共 {len(results)} 条结果")
+    index.close()
+
+if __name__ == "__main__":
+    main()
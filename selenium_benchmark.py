@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Selenium爬虫性能基准测试
+在本地HTTP服务上模拟 m.weibo.cn/u/{uid} 用户主页（.m-item-box 卡片、滚动到底部时加载下一页），
+接口数据可以是合成的，也可以是录制的真实响应；每轮记录各阶段耗时、WebDriver命令数和Chrome内存，
+结果保存为JSON，便于比较修改前后的性能
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import statistics
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from config import BENCHMARK_CONFIG
+from weibo_selenium_scraper import WeiboSeleniumScraper
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<title>微博</title>
+<style>
+  body { margin: 0; font-size: 15px; }
+  .m-item-box { padding: 12px; border-bottom: 8px solid #f2f2f2; min-height: 160px; }
+  .weibo-text { line-height: 1.6; }
+  .url-icon img { width: 1em; height: 1em; }
+</style>
+</head>
+<body>
+<div id="app"><div class="profile-header"><h3 class="m-text-cut" id="screen-name"></h3></div><div id="cards"></div></div>
+<script>
+const uid = "__UID__";
+const api = "/api/container/getIndex";
+let page = 1, loading = false, done = false;
+
+function renderCard(mblog) {
+  const item = document.createElement("div");
+  item.className = "m-item-box";
+  item.innerHTML =
+    '<div class="card m-panel card9"><div class="card-wrap">' +
+    '<header class="weibo-top m-box"><div class="m-box-col"><h3 class="m-text-cut">' + mblog.user.screen_name +
+    '</h3><h4 class="m-text-cut"><span class="time">' + mblog.created_at + '</span></h4></div></header>' +
+    '<article class="weibo-main"><div class="weibo-og"><div class="weibo-text">' + mblog.text + '</div></div></article>' +
+    '<footer class="m-ctrl-box"><div class="m-diy-btn"><h4>' + mblog.reposts_count + '</h4></div>' +
+    '<div class="m-diy-btn"><h4>' + mblog.comments_count + '</h4></div>' +
+    '<div class="m-diy-btn"><h4>' + mblog.attitudes_count + '</h4></div></footer>' +
+    '</div></div>';
+  document.getElementById("cards").appendChild(item);
+}
+
+async function loadProfile() {
+  const response = await fetch(api + "?type=uid&value=" + uid + "&containerid=100505" + uid);
+  const data = await response.json();
+  if (data.ok === 1) {
+    document.getElementById("screen-name").textContent = data.data.userInfo.screen_name;
+  }
+}
+
+async function loadMore() {
+  if (loading || done) return;
+  loading = true;
+  const response = await fetch(api + "?type=uid&value=" + uid + "&containerid=107603" + uid + "&page=" + page);
+  const data = await response.json();
+  const cards = data.ok === 1 ? data.data.cards : [];
+  if (!cards.length) {
+    done = true;
+  } else {
+    cards.filter(card => card.card_type === 9).forEach(card => renderCard(card.mblog));
+    page += 1;
+  }
+  loading = false;
+}
+
+window.addEventListener("scroll", () => {
+  if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 200) loadMore();
+});
+loadProfile().then(loadMore);
+</script>
+</body>
+</html>
+"""
+
+def synthetic_fixture(uid, pages, cards_per_page, seed=0):
+    """生成合成的接口数据，返回 (用户资料响应, [每页微博列表响应])，正文包含话题、@用户、链接和表情"""
+    rng = random.Random(seed)
+    user = {'id': int(uid), 'screen_name': f'测试用户{uid}', 'followers_count': 12345, 'follow_count': 321,
+            'statuses_count': pages * cards_per_page, 'description': '基准测试用户', 'verified': False}
+    profile = {'ok': 1, 'data': {'userInfo': user}}
+    start = datetime(2024, 6, 1, 12, 0)
+    mblog_id = 5000000000000000
+    page_responses = []
+    for page in range(pages):
+        cards = []
+        for i in range(cards_per_page):
+            n = page * cards_per_page + i
+            text = ('今天的内容' * rng.randint(1, 20) +
+                    '<a href="https://m.weibo.cn/search?containerid=231522type%3D1%26q%3D%23话题%23">'
+                    '<span class="surl-text">#话题' + str(n % 7) + '#</span></a> '
+                    "<a href='/n/朋友" + str(n % 5) + "'>@朋友" + str(n % 5) + '</a> '
+                    '<span class="url-icon"><img alt=[笑cry] src="https://h5.sinaimg.cn/m/emoticon/icon/default/d_xiaoku.png"'
+                    ' style="width:1em; height:1em;" /></span>')
+            cards.append({'card_type': 9, 'mblog': {
+                'id': str(mblog_id - n),
+                'created_at': (start - timedelta(hours=n * 7)).strftime('%m-%d'),
+                'text': text,
+                'source': 'iPhone客户端',
+                'reposts_count': rng.randint(0, 500),
+                'comments_count': rng.randint(0, 500),
+                'attitudes_count': rng.randint(0, 5000),
+                'pics': [{'large': {'url': f'https://wx1.sinaimg.cn/large/{mblog_id - n}_{k}.jpg'}}
+                         for k in range(rng.randint(0, 3))],
+                'user': {'id': int(uid), 'screen_name': user['screen_name']},
+            }})
+        page_responses.append({'ok': 1, 'data': {'cards': cards}})
+    return profile, page_responses
+
+def load_fixture_dir(fixture_dir):
+    """加载录制的接口响应：profile.json 为用户资料接口的响应，page_1.json、page_2.json…… 为微博列表各页的响应"""
+    with open(os.path.join(fixture_dir, 'profile.json'), 'r', encoding='utf-8') as f:
+        profile = json.load(f)
+    page_responses = []
+    while os.path.exists(os.path.join(fixture_dir, f'page_{len(page_responses) + 1}.json')):
+        with open(os.path.join(fixture_dir, f'page_{len(page_responses) + 1}.json'), 'r', encoding='utf-8') as f:
+            page_responses.append(json.load(f))
+    return profile, page_responses
+
+class FixtureServer:
+    """在本地提供用户主页和 getIndex 接口，接口响应前等待 api_delay 秒模拟网络延迟"""
+
+    def __init__(self, uid, profile, page_responses, api_delay=0.0):
+        self.uid = str(uid)
+        self.profile = json.dumps(profile, ensure_ascii=False).encode('utf-8')
+        self.pages = [json.dumps(p, ensure_ascii=False).encode('utf-8') for p in page_responses]
+        self.api_delay = api_delay
+        self.requests = Counter()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fixture-server', daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def _handler(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == f'/u/{fixture.uid}':
+                    fixture.requests['page'] += 1
+                    self._send(PAGE_TEMPLATE.replace('__UID__', fixture.uid).encode('utf-8'), 'text/html')
+                elif parsed.path == '/api/container/getIndex':
+                    fixture.requests['api'] += 1
+                    time.sleep(fixture.api_delay)
+                    self._send(fixture.response(parse_qs(parsed.query)), 'application/json')
+                else:
+                    self.send_error(404)
+
+            def _send(self, body, content_type):
+                self.send_response(200)
+                self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'no-store')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def response(self, query):
+        containerid = query.get('containerid', [''])[0]
+        if containerid.startswith('100505'):
+            return self.profile
+        page = int(query.get('page', ['1'])[0])
+        if 1 <= page <= len(self.pages):
+            return self.pages[page - 1]
+        # 超出最后一页时与真实接口一样返回 ok=0
+        return b'{"ok": 0, "msg": "\\u8fd9\\u91cc\\u8fd8\\u6ca1\\u6709\\u5185\\u5bb9", "data": {"cards": []}}'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class CommandCounter:
+    """统计 WebDriver 发出的命令数（execute_script、get_log、execute_cdp_cmd 等都经过 driver.execute）"""
+
+    def __init__(self, driver):
+        self.counts = Counter()
+        self.enabled = True
+        execute = driver.execute
+
+        def counted_execute(command, params=None):
+            if self.enabled:
+                self.counts[command] += 1
+            return execute(command, params)
+
+        driver.execute = counted_execute
+
+    def total(self):
+        return sum(self.counts.values())
+
+def chrome_memory_mb(scraper, counter):
+    """Chrome（浏览器及所有子进程）的常驻内存，未安装 psutil 时改用页面的JS堆大小；不计入命令数"""
+    counter.enabled = False
+    try:
+        if psutil is not None:
+            try:
+                processes = psutil.Process(scraper.driver.service.process.pid).children(recursive=True)
+                return round(sum(p.memory_info().rss for p in processes) / 1024 / 1024, 1), 'rss'
+            except (psutil.Error, AttributeError):
+                pass
+        scraper.driver.execute_cdp_cmd('Performance.enable', {})
+        metrics = scraper.driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']
+        heap = next((m['value'] for m in metrics if m['name'] == 'JSHeapUsedSize'), 0)
+        return round(heap / 1024 / 1024, 1), 'js_heap'
+    finally:
+        counter.enabled = True
+
+def _timed(counter, func, *args):
+    """执行并返回 (结果, 耗时秒数, 命令数)"""
+    commands = counter.total()
+    start = time.perf_counter()
+    result = func(*args)
+    return result, round(time.perf_counter() - start, 3), counter.total() - commands
+
+def run_benchmark(uid, profile, page_responses, runs=None, api_delay=None, max_scrolls=None, headless=True):
+    """启动本地服务和浏览器，执行 runs 轮抓取，返回结果字典"""
+    runs = runs or BENCHMARK_CONFIG['runs']
+    api_delay = BENCHMARK_CONFIG['api_delay'] if api_delay is None else api_delay
+    max_scrolls = max_scrolls or len(page_responses) + 1
+    expected = sum(1 for p in page_responses for card in p.get('data', {}).get('cards', [])
+                   if card.get('card_type') == 9 and card.get('mblog'))
+
+    server = FixtureServer(uid, profile, page_responses, api_delay).start()
+    start = time.perf_counter()
+    scraper = WeiboSeleniumScraper(headless=headless)
+    startup_time = round(time.perf_counter() - start, 3)
+    scraper.base_url = server.url
+    counter = CommandCounter(scraper.driver)
+
+    results = []
+    try:
+        for run in range(1, runs + 1):
+            scraper.pending = {}
+            scraper.captured = []
+            counter.counts.clear()
+            server.requests.clear()
+
+            user_info, profile_time, profile_commands = _timed(counter, scraper.get_user_profile, uid)
+            _, scroll_time, scroll_commands = _timed(counter, scraper.scroll_and_load_weibos, max_scrolls)
+            weibos, parse_time, parse_commands = _timed(counter, scraper.parse_captured_weibos)
+            memory, memory_source = chrome_memory_mb(scraper, counter)
+
+            record = {
+                'run': run,
+                'get_user_profile': profile_time,
+                'scroll_and_load_weibos': scroll_time,
+                'parse_captured_weibos': parse_time,
+                'total': round(profile_time + scroll_time + parse_time, 3),
+                'commands': counter.total(),
+                'profile_commands': profile_commands,
+                'scroll_commands': scroll_commands,
+                'parse_commands': parse_commands,
+                'command_counts': dict(counter.counts.most_common()),
+                'chrome_memory_mb': memory,
+                'memory_source': memory_source,
+                'api_requests': server.requests['api'],
+                'weibos': len(weibos),
+                'expected_weibos': expected,
+                'screen_name_ok': bool(user_info) and
+                                  user_info.get('screen_name') == profile['data']['userInfo']['screen_name'],
+            }
+            results.append(record)
+            print(f"第 {run}/{runs} 轮: 总耗时 {record['total']} 秒，WebDriver命令 {record['commands']} 个，"
+                  f"内存 {memory} MB，解析 {record['weibos']}/{expected} 条微博")
+    finally:
+        scraper.close()
+        server.stop()
+
+    metrics = [key for key, value in results[0].items() if isinstance(value, (int, float))
+               and not isinstance(value, bool) and key != 'run']
+    return {
+        'time': datetime.now().isoformat(),
+        'settings': {'uid': str(uid), 'pages': len(page_responses), 'expected_weibos': expected, 'runs': runs,
+                     'api_delay': api_delay, 'max_scrolls': max_scrolls, 'headless': headless},
+        'driver_startup': startup_time,
+        'runs': results,
+        'median': {key: statistics.median(r[key] for r in results) for key in metrics},
+    }
+
+def compare(before, after):
+    """打印两次结果中各项中位数的变化"""
+    print(f"{'指标':<26}{'修改前':>12}{'修改后':>12}{'变化':>10}")
+    for key, new in after['median'].items():
+        old = before.get('median', {}).get(key)
+        if old is None:
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else '-'
+        print(f"{key:<26}{old:>12}{new:>12}{change:>10}")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Selenium爬虫性能基准测试（本地模拟页面，不访问微博）')
+    parser.add_argument('--uid', default='1234567890', help='模拟的用户UID')
+    parser.add_argument('--fixture-dir', help='录制的接口响应目录（profile.json、page_1.json……），不指定时使用合成数据')
+    parser.add_argument('--pages', type=int, default=BENCHMARK_CONFIG['pages'], help='合成数据的页数')
+    parser.add_argument('--cards', type=int, default=BENCHMARK_CONFIG['cards_per_page'], help='合成数据每页微博数')
+    parser.add_argument('--api-delay', type=float, default=BENCHMARK_CONFIG['api_delay'], help='接口响应延迟（秒）')
+    parser.add_argument('--runs', type=int, default=BENCHMARK_CONFIG['runs'], help='重复轮数')
+    parser.add_argument('--max-scrolls', type=int, help='最多滚动次数，默认为页数+1')
+    parser.add_argument('--show-browser', action='store_true', help='显示浏览器窗口')
+    parser.add_argument('--output', help='结果文件，默认 selenium_benchmark_<时间>.json')
+    parser.add_argument('--compare', help='与之前保存的结果文件比较')
+    args = parser.parse_args()
+
+    if args.fixture_dir:
+        profile, page_responses = load_fixture_dir(args.fixture_dir)
+    else:
+        profile, page_responses = synthetic_fixture(args.uid, args.pages, args.cards)
+
+    result = run_benchmark(args.uid, profile, page_responses, runs=args.runs, api_delay=args.api_delay,
+                           max_scrolls=args.max_scrolls, headless=not args.show_browser)
+    output_file = args.output or f"selenium_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {output_file}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(json.load(f), result)
+
+if __name__ == "__main__":
+    main()
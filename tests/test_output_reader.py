@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+output_writer 写出、output_reader 按索引读回的往返测试
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import output_writer
+from output_writer import StreamOutput
+from output_reader import OutputReader, iter_records
+
+def make_records(count):
+    rng = random.Random(0)
+    return [{'id': str(4900000000000000 + i), 'user_id': str(i % 3), 'created_timestamp': 1700000000 + i * 3600,
+             'text': '今天天气很好' * rng.randint(1, 40), 'pics': []} for i in range(count)]
+
+class OutputReaderRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.records = make_records(600)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def write(self, save_format, compression):
+        with StreamOutput(self.output_dir, save_format, compression=compression) as output:
+            for record in self.records:
+                output.write(record)
+        return output.files[0]
+
+    def check_round_trip(self, save_format, compression):
+        filename = self.write(save_format, compression)
+        self.assertEqual(list(iter_records(filename)), self.records)
+        with OutputReader(filename) as reader:
+            self.assertEqual(len(reader), len(self.records))
+            # 打乱顺序，包含往回跳读
+            for i in random.Random(1).sample(range(len(self.records)), 100):
+                self.assertEqual(reader.get(self.records[i]['id']), self.records[i])
+            self.assertIsNone(reader.get('1'))
+            self.assertEqual(list(reader.iter(uid='1')), [r for r in self.records if r['user_id'] == '1'])
+        # 再次打开时复用索引
+        with OutputReader(filename) as reader:
+            self.assertEqual(reader.get(self.records[-1]['id']), self.records[-1])
+
+    def test_uncompressed(self):
+        for save_format in ('jsonl', 'json'):
+            with self.subTest(save_format=save_format):
+                self.check_round_trip(save_format, False)
+
+    def test_gzip(self):
+        # 小块写出多个gzip成员，按ID读取从所在成员开始解压
+        with mock.patch.object(output_writer, 'GZIP_BLOCK_SIZE', 4096):
+            for save_format in ('jsonl', 'json'):
+                with self.subTest(save_format=save_format):
+                    self.check_round_trip(save_format, 'gzip')
+        with OutputReader(os.path.join(self.output_dir, 'weibos.jsonl.gz')) as reader:
+            self.assertGreater(reader.conn.execute('SELECT COUNT(*) FROM members').fetchone()[0], 1)
+
+    @unittest.skipIf(output_writer.zstandard is None, '未安装 zstandard')
+    def test_zstd(self):
+        for save_format in ('jsonl', 'json'):
+            with self.subTest(save_format=save_format):
+                self.check_round_trip(save_format, 'zstd')
+
+if __name__ == "__main__":
+    unittest.main()
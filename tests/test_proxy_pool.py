@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ProxyPool 对本地代理替身的剔除、重新探测和每个代理的速率限制
+"""
+
+import time
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from proxy_pool import ProxyPool
+
+# 不会被解析的域名：请求只能经过代理替身到达
+TARGET_URL = 'http://weibo.test/api/container/getIndex'
+PROBE_URL = 'http://weibo.test/probe'
+
+class ProxyStandIn:
+    """本地HTTP代理替身：对转发来的任何请求返回 status，记录收到的路径"""
+
+    def __init__(self, status=200):
+        self.status = status
+        self.paths = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.paths.append(self.path)
+                body = b'{"ok": 1}'
+                self.send_response(stand_in.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def requests_to(self, url):
+        return sum(1 for path in self.paths if path == url)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class ProxyPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.stand_ins = []
+
+    def tearDown(self):
+        for stand_in in self.stand_ins:
+            stand_in.close()
+
+    def make_pool(self, statuses, rate=100, burst=100):
+        self.stand_ins = [ProxyStandIn(status) for status in statuses]
+        pool = ProxyPool([s.url for s in self.stand_ins], requests_per_second=rate, burst=burst)
+        pool.probe_url = PROBE_URL
+        pool.probe_timeout = 2
+        session = pool.session()
+        # 不使用环境变量中的代理设置
+        session.trust_env = False
+        return pool, session
+
+    def test_failing_proxy_evicted(self):
+        pool, session = self.make_pool([500, 500])
+        pool.max_failures = 2
+        session.get(TARGET_URL)
+        # 失败的代理得分变差，下一个请求改用另一个代理
+        self.assertEqual([s.requests_to(TARGET_URL) for s in self.stand_ins], [1, 0])
+        session.get(TARGET_URL)
+        self.assertEqual(pool.healthy_count(), 2)
+        # 连续失败 max_failures 次后剔除
+        session.get(TARGET_URL)
+        session.get(TARGET_URL)
+        self.assertEqual([s.requests_to(TARGET_URL) for s in self.stand_ins], [2, 2])
+        self.assertEqual(pool.healthy_count(), 0)
+        self.assertEqual([stat['evictions'] for stat in pool.stats()], [1, 1])
+
+    def test_evicted_proxy_reprobed_and_readmitted(self):
+        pool, session = self.make_pool([429, 200])
+        bad, good = self.stand_ins
+        pool.eviction_seconds = 0.2
+        session.get(TARGET_URL)  # 被限流，立即剔除
+        self.assertEqual(pool.healthy_count(), 1)
+
+        # 剔除期内不探测
+        session.get(TARGET_URL)
+        self.assertEqual(bad.requests_to(PROBE_URL), 0)
+
+        bad.status = 200
+        time.sleep(0.3)
+        session.get(TARGET_URL)
+        self.assertEqual(bad.requests_to(PROBE_URL), 1)
+        self.assertEqual(pool.healthy_count(), 2)
+
+    def test_failed_probe_backs_off(self):
+        pool, session = self.make_pool([429, 200])
+        bad, good = self.stand_ins
+        pool.eviction_seconds = 0.1
+        session.get(TARGET_URL)
+        time.sleep(0.15)
+        session.get(TARGET_URL)  # 探测仍然被限流，剔除时间翻倍
+        self.assertEqual(bad.requests_to(PROBE_URL), 1)
+        self.assertEqual(pool.stats()[0]['evictions'], 2)
+        self.assertEqual(pool.healthy_count(), 1)
+
+    def test_per_proxy_rate_budget(self):
+        pool, session = self.make_pool([200, 200], rate=2, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            session.get(TARGET_URL)
+        # 两个代理各用完自己的突发额度，不需要等待
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual([s.requests_to(TARGET_URL) for s in self.stand_ins], [2, 2])
+
+        # 额度用完后按每个代理每秒2次补充
+        session.get(TARGET_URL)
+        self.assertGreater(time.monotonic() - start, 0.35)
+        self.assertEqual(sum(s.requests_to(TARGET_URL) for s in self.stand_ins), 5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ScrapeRouter 只把接口不可用的用户交给浏览器，网络错误和限流不升级
+"""
+
+import os
+import tempfile
+import unittest
+from contextlib import contextmanager
+import requests
+from dedup_store import DedupStore
+from scrape_router import ScrapeRouter
+
+class FakeResponse:
+    def __init__(self, data=None, status_code=200, url='https://m.weibo.cn/api/container/getIndex',
+                 content_type='application/json'):
+        self.data = data
+        self.status_code = status_code
+        self.url = url
+        self.headers = {'Content-Type': content_type}
+        self.content = b'{}'
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} Client Error', response=self)
+
+    def json(self):
+        return self.data
+
+USER_INFO = {'id': 1234567890, 'screen_name': '测试用户', 'statuses_count': 50, 'followers_count': 10}
+
+def make_fetch(timeline):
+    def fetch(url, params):
+        if params['containerid'].startswith('100505'):
+            return FakeResponse({'ok': 1, 'data': {'userInfo': USER_INFO}})
+        return timeline()
+    return fetch
+
+def connection_error():
+    raise requests.ConnectionError('Connection refused')
+
+def teapot():
+    return FakeResponse(status_code=418)
+
+def visitor_wall():
+    return FakeResponse(url='https://passport.weibo.cn/visitor/visitor', content_type='text/html')
+
+class FakeBrowser:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def scrape_user_weibos(self, uid, max_scrolls):
+        self.pool.scraped.append(uid)
+        if not self.pool.weibos:
+            return None
+        return {'user_info': USER_INFO, 'weibos': self.pool.weibos}
+
+    def save_data(self, result, output_dir):
+        return output_dir
+
+class FakeBrowserPool:
+    size = 1
+
+    def __init__(self, weibos=None):
+        self.scraped = []
+        self.weibos = weibos
+
+    @contextmanager
+    def scraper(self):
+        yield FakeBrowser(self)
+
+    def close(self):
+        pass
+
+class ScrapeRouterEscalationTest(unittest.TestCase):
+    def route(self, timeline, weibos=None, dedup=None):
+        pool = FakeBrowserPool(weibos)
+        router = ScrapeRouter(browser_pool=pool, dedup=dedup)
+        router.scraper.page_delay = 0
+        router.scraper.fetch = make_fetch(timeline)
+        results = router.route(['1234567890'], max_pages=2, delay=0)
+        return results['1234567890'], pool.scraped
+
+    def test_network_error_not_escalated(self):
+        record, scraped = self.route(connection_error)
+        self.assertEqual(record['failure'], 'error')
+        self.assertEqual(record['route'], 'api')
+        self.assertEqual(scraped, [])
+
+    def test_throttled_not_escalated(self):
+        record, scraped = self.route(teapot)
+        self.assertEqual(record['failure'], 'throttled')
+        self.assertEqual(record['route'], 'api')
+        self.assertEqual(scraped, [])
+
+    def test_visitor_wall_escalated(self):
+        record, scraped = self.route(visitor_wall)
+        self.assertEqual(record['route'], 'selenium')
+        self.assertEqual(record['api_failure'], 'visitor_wall')
+        self.assertEqual(scraped, ['1234567890'])
+
+    def test_browser_weibos_marked_seen(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dedup = DedupStore(os.path.join(tmp, 'dedup.db'), capacity=1000, error_rate=0.01)
+            record, scraped = self.route(visitor_wall, weibos=[{'id': '501'}, {'id': '502'}], dedup=dedup)
+            self.assertTrue(record['success'])
+            self.assertEqual(record['route'], 'selenium')
+            self.assertTrue(dedup.is_seen('501'))
+            self.assertTrue(dedup.is_seen('502'))
+            self.assertFalse(dedup.is_seen('503'))
+            dedup.close()
+
+if __name__ == "__main__":
+    unittest.main()
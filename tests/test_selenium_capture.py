@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WeiboSeleniumScraper.capture_api_responses 从性能日志中截获 getIndex 响应
+"""
+
+import json
+import logging
+import unittest
+from profiler import NullProfiler
+from weibo_selenium_scraper import WeiboSeleniumScraper
+
+API_URL = 'https://m.weibo.cn/api/container/getIndex?type=uid&value=1&containerid=1005051'
+
+def log_entry(method, params):
+    return {'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+class FakeDriver:
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get_log(self, log_type):
+        entries, self.entries = self.entries, []
+        return entries
+
+    def execute_cdp_cmd(self, command, params):
+        return {'body': json.dumps({'ok': 1, 'data': {'userInfo': {'id': 1}}}), 'base64Encoded': False}
+
+def make_scraper(entries):
+    # 不启动浏览器，只设置 capture_api_responses 用到的属性
+    scraper = WeiboSeleniumScraper.__new__(WeiboSeleniumScraper)
+    scraper.profiler = NullProfiler()
+    scraper.logger = logging.getLogger(__name__)
+    scraper.pending = {}
+    scraper.captured = []
+    scraper.driver = FakeDriver(entries)
+    return scraper
+
+class CaptureApiResponsesTest(unittest.TestCase):
+    def test_extra_info_events_ignored(self):
+        scraper = make_scraper([
+            log_entry('Network.responseReceivedExtraInfo',
+                      {'requestId': '7', 'headers': {'referer': API_URL}, 'headersText': API_URL}),
+            log_entry('Network.responseReceived', {'requestId': '7', 'response': {'url': API_URL}}),
+            log_entry('Network.loadingFinished', {'requestId': '7'}),
+        ])
+        self.assertEqual(scraper.capture_api_responses(), 1)
+        self.assertEqual(scraper.captured, [('1005051', {'ok': 1, 'data': {'userInfo': {'id': 1}}})])
+        self.assertEqual(scraper.pending, {})
+
+if __name__ == "__main__":
+    unittest.main()
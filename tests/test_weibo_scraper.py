@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开启去重时 scrape_user_weibos 对"没有新微博"和抓取失败的区分
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from batch_scraper import BatchWeiboScraper
+from dedup_store import DedupStore
+from scrape_router import ESCALATE_FAILURES
+
+USER_INFO = {'id': 1234567890, 'screen_name': '测试用户', 'followers_count': 10, 'statuses_count': 2}
+
+class FakeResponse:
+    def __init__(self, data=None, url='https://m.weibo.cn/api/container/getIndex', content_type='application/json'):
+        self.data = data
+        self.url = url
+        self.headers = {'Content-Type': content_type}
+        self.content = b'{}'
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+def visitor_wall(url, params):
+    return FakeResponse(url='https://passport.weibo.cn/visitor/visitor?entry=miniblog', content_type='text/html')
+
+def api_not_ok(url, params):
+    return FakeResponse({'ok': 0, 'msg': '这里还没有内容'})
+
+def timeline(url, params):
+    if params['page'] > 1:
+        return FakeResponse({'ok': 0})
+    cards = [{'card_type': 9, 'mblog': {'id': str(4900000000000000 + i), 'created_at': '2024-01-01',
+                                        'text': f'第{i}条微博', 'user': {'id': 1234567890, 'screen_name': '测试用户'}}}
+             for i in range(2)]
+    return FakeResponse({'ok': 1, 'data': {'cards': cards}})
+
+class DedupFailureTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.dedup = DedupStore(os.path.join(self.tmp_dir, 'dedup.db'))
+        self.batch = BatchWeiboScraper(dedup=self.dedup)
+        self.batch.scraper.page_delay = 0
+
+    def tearDown(self):
+        self.dedup.conn.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def scrape(self, fetch):
+        self.batch.scraper.fetch = fetch
+        return self.batch.scrape_one_user('1234567890', max_pages=2, user_info=USER_INFO)
+
+    def test_visitor_wall_is_failure(self):
+        record = self.scrape(visitor_wall)
+        self.assertFalse(record['success'])
+        self.assertEqual(record['failure'], 'visitor_wall')
+        self.assertIn(record['failure'], ESCALATE_FAILURES)
+
+    def test_api_not_ok_is_failure(self):
+        record = self.scrape(api_not_ok)
+        self.assertFalse(record['success'])
+        self.assertEqual(record['failure'], 'api_not_ok')
+
+    def test_all_seen_is_no_new_posts(self):
+        self.dedup.mark_seen(['4900000000000000', '4900000000000001'])
+        record = self.scrape(timeline)
+        self.assertTrue(record['success'])
+        self.assertEqual(record['weibo_count'], 0)
+        self.assertIsNone(record['output_dir'])
+
+if __name__ == "__main__":
+    unittest.main()
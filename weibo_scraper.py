@@ -9,16 +9,176 @@ import requests
 import json
 import time
 import re
-import pandas as pd
 from urllib.parse import urlencode, quote
 from fake_useragent import UserAgent
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import os
+import argparse
+import threading
+from media_downloader import MediaDownloader
+from proxy_pool import ProxyPool
+from archive import RawArchive
+from profiler import NullProfiler, create_profiler
+from log_setup import setup_logging
+from output_writer import StreamOutput
+from config import ARCHIVE_CONFIG, SEARCH_INDEX_CONFIG
+
+# 微博接口返回的时间均为北京时间
+CST = timezone(timedelta(hours=8))
+RELATIVE_TIME_PATTERN = re.compile(r'^(\d+)\s*(秒|分钟|小时|天)前$')
+DAY_TIME_PATTERN = re.compile(r'^(今天|昨天|前天)\s*(\d{1,2}):(\d{2})$')
+DATE_PATTERN = re.compile(r'^(?:(\d{4})-)?(\d{1,2})-(\d{1,2})(?:\s+(\d{1,2}):(\d{2}))?$')
+RELATIVE_UNITS = {'秒': 1, '分钟': 60, '小时': 3600, '天': 86400}
+DAY_OFFSETS = {'今天': 0, '昨天': 1, '前天': 2}
+# 这些HTTP状态码表示请求被限流或拦截
+THROTTLE_STATUS_CODES = (403, 418, 429)
+HTML_TAG_PATTERN = re.compile(r'<(?=[^>])(/?)(\w*)([^>]*)>')
+HTML_ATTR_PATTERN = re.compile(r'''([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''')
+
+def normalize_created_at(created_at, now=None):
+    """将微博发布时间（"刚刚"、"5分钟前"、"昨天 12:30"、"03-15"、接口原始格式等）转换为带时区的datetime，无法识别时返回None"""
+    if not created_at:
+        return None
+    created_at = created_at.strip()
+    now = now or datetime.now(CST)
+    
+    if created_at == '刚刚':
+        return now
+    
+    # 接口原始格式: Sat Mar 15 12:30:00 +0800 2025
+    if created_at[0].isalpha() and created_at[0].isascii():
+        try:
+            return datetime.strptime(created_at, '%a %b %d %H:%M:%S %z %Y').astimezone(CST)
+        except ValueError:
+            return None
+    
+    match = RELATIVE_TIME_PATTERN.match(created_at)
+    if match:
+        return now - timedelta(seconds=int(match.group(1)) * RELATIVE_UNITS[match.group(2)])
+    
+    match = DAY_TIME_PATTERN.match(created_at)
+    if match:
+        day = now - timedelta(days=DAY_OFFSETS[match.group(1)])
+        return day.replace(hour=int(match.group(2)), minute=int(match.group(3)), second=0, microsecond=0)
+    
+    match = DATE_PATTERN.match(created_at)
+    if match:
+        year, month, day, hour, minute = match.groups()
+        try:
+            result = now.replace(year=int(year) if year else now.year, month=int(month), day=int(day),
+                                 hour=int(hour or 0), minute=int(minute or 0), second=0, microsecond=0)
+            if not year and result > now:
+                # 不带年份的日期只会是过去的时间，跨年时属于上一年
+                result = result.replace(year=now.year - 1)
+        except ValueError:
+            return None
+        return result
+    
+    return None
+
+def parse_time_bound(value):
+    """将时间窗口边界（datetime、时间戳或"YYYY-MM-DD[ HH:MM]"字符串）转换为时间戳"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=CST)
+        return value.timestamp()
+    parsed = normalize_created_at(str(value))
+    if parsed is None:
+        raise ValueError(f"无法识别的时间: {value}")
+    return parsed.timestamp()
+
+def is_pinned(mblog):
+    """是否为置顶微博（置顶微博不按时间排序，不能用来判断是否翻到了时间窗口之外）"""
+    return mblog.get('isTop') == 1 or (mblog.get('title') or {}).get('text') == '置顶'
+
+def parse_user_info(userinfo):
+    """从接口返回的 userInfo 中提取用户基本信息"""
+    return {
+        'uid': userinfo.get('id'),
+        'screen_name': userinfo.get('screen_name'),
+        'followers_count': userinfo.get('followers_count'),
+        'follow_count': userinfo.get('follow_count'),
+        'statuses_count': userinfo.get('statuses_count'),
+        'description': userinfo.get('description'),
+        'verified': userinfo.get('verified'),
+        'verified_reason': userinfo.get('verified_reason', '')
+    }
+
+def _html_attrs(attr_text):
+    return {m.group(1).lower(): m.group(2) or m.group(3) or m.group(4) or ''
+            for m in HTML_ATTR_PATTERN.finditer(attr_text)}
+
+def parse_text_html(html):
+    """一次扫描微博正文HTML，返回去掉标签后的文本（与直接删除所有标签的结果相同）
+    和从标签中提取的话题、@用户、链接、表情（表情图片的alt文字不在文本中）"""
+    parts = []
+    entities = {'topics': [], 'mentions': [], 'links': [], 'emoji': []}
+    anchor = None
+    pos = 0
+    for match in HTML_TAG_PATTERN.finditer(html or ''):
+        if match.start() > pos:
+            parts.append(html[pos:match.start()])
+            if anchor is not None:
+                anchor[1].append(html[pos:match.start()])
+        pos = match.end()
+
+        closing, tag = match.group(1), match.group(2).lower()
+        if tag == 'a':
+            if not closing:
+                anchor = (_html_attrs(match.group(3)), [])
+            elif anchor is not None:
+                attrs, label = anchor[0], ''.join(anchor[1]).strip()
+                anchor = None
+                if label.startswith('@'):
+                    entities['mentions'].append(label[1:])
+                elif len(label) > 2 and label.startswith('#') and label.endswith('#'):
+                    entities['topics'].append(label[1:-1])
+                elif not attrs.get('href', '').startswith('/status/'):
+                    # 指向微博本身的“全文”链接不算
+                    entities['links'].append({'text': label, 'url': attrs.get('data-url') or attrs.get('href', '')})
+        elif tag == 'img' and not closing:
+            alt = _html_attrs(match.group(3)).get('alt', '')
+            if alt.startswith('[') and alt.endswith(']'):
+                entities['emoji'].append(alt)
+    parts.append(html[pos:] if html else '')
+    return ''.join(parts), entities
+
+def is_visitor_wall(response):
+    """是否被重定向到游客验证页（返回的是HTML而不是JSON）"""
+    url = getattr(response, 'url', '') or ''
+    content_type = response.headers.get('Content-Type', '')
+    return 'passport.weibo.cn' in url or 'visitor' in url or 'text/html' in content_type
+
+def request_failure(error):
+    """请求异常对应的失败原因：被限流或拦截时为 throttled，其他为 error"""
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return 'throttled' if status in THROTTLE_STATUS_CODES else 'error'
 
 class WeiboScraper:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, proxy_pool=None, identity_pool=None, archive=None, profiler=None, dedup=None,
+                 search_index=None, limiter=None):
+        # 使用代理池或身份池时由各自的速率限制控制请求间隔
+        self.session = proxy_pool.session() if proxy_pool else requests.Session()
+        self.identity_pool = identity_pool
+        # 多线程共用本对象时的共享限速器，每次请求前获取令牌
+        self.limiter = limiter
+        self.archive = archive
+        self.profiler = profiler or NullProfiler()
+        # 批量抓取时共享的去重存储：跳过已保存过的微博，被转发的原微博只保存一次
+        self.dedup = dedup
+        self.search_index = search_index
+        # 批量抓取的各线程共用一个媒体下载器，第一次需要时创建
+        self.media_downloader = None
+        self.media_lock = threading.Lock()
+        # 各线程最近一次抓取失败的原因（api_not_ok/visitor_wall/empty_cards/throttled/error），用于判断是否改用浏览器抓取，
+        # 以及最近一次获取微博列表时返回 ok=1 的页数和其中有卡片的页数
+        self.local = threading.local()
+        self.page_delay = 0 if proxy_pool or identity_pool else 2
         self.ua = UserAgent()
         self.headers = {
             'User-Agent': self.ua.chrome,
@@ -31,15 +191,23 @@ class WeiboScraper:
         self.session.headers.update(self.headers)
         
         # 设置日志
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('weibo_scraper.log', encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        setup_logging()
         self.logger = logging.getLogger(__name__)
+    
+    def _set_failure(self, reason):
+        self.local.failure = reason
+    
+    def last_failure(self):
+        """当前线程最近一次 scrape_user_weibos 失败的原因，成功时为None"""
+        return getattr(self.local, 'failure', None)
+    
+    def fetch(self, url, params):
+        """发送GET请求，配置了身份池时由身份池分配会话"""
+        if self.limiter:
+            self.limiter.acquire()
+        if self.identity_pool:
+            return self.identity_pool.get(url, params=params)
+        return self.session.get(url, params=params)
         
     def get_user_info(self, uid):
         """获取用户基本信息"""
@@ -51,33 +219,38 @@ class WeiboScraper:
         }
         
         try:
-            response = self.session.get(url, params=params)
+            with self.profiler.phase('network'):
+                response = self.fetch(url, params)
             response.raise_for_status()
-            data = response.json()
+            if is_visitor_wall(response):
+                self._set_failure('visitor_wall')
+                self.logger.warning("获取用户信息时被重定向到游客验证页")
+                return None
+            with self.profiler.phase('json_decode'):
+                data = response.json()
             
-            if data.get('ok') == 1:
-                userinfo = data.get('data', {}).get('userInfo', {})
-                return {
-                    'uid': userinfo.get('id'),
-                    'screen_name': userinfo.get('screen_name'),
-                    'followers_count': userinfo.get('followers_count'),
-                    'follow_count': userinfo.get('follow_count'),
-                    'statuses_count': userinfo.get('statuses_count'),
-                    'description': userinfo.get('description'),
-                    'verified': userinfo.get('verified'),
-                    'verified_reason': userinfo.get('verified_reason', '')
-                }
+            if data.get('ok') != 1:
+                self._set_failure('api_not_ok')
+            else:
+                return parse_user_info(data.get('data', {}).get('userInfo', {}))
         except Exception as e:
+            self._set_failure(request_failure(e))
             self.logger.error(f"获取用户信息失败: {e}")
             return None
     
-    def get_user_weibo_list(self, uid, max_pages=10):
-        """获取用户微博列表"""
+    def get_user_weibo_list(self, uid, max_pages=10, since=None, until=None, since_id=None):
+        """获取用户微博列表，指定 since/until 时只保留该时间窗口内的微博，
+        指定 since_id 时遇到不晚于该ID的非置顶微博（即已抓取过的微博）即停止"""
         weibos = []
+        since_id = int(since_id) if since_id else None
         containerid = f'107603{uid}'
+        since_ts = parse_time_bound(since)
+        until_ts = parse_time_bound(until)
+        self.local.ok_responses = 0
+        self.local.ok_pages = 0
         
         for page in range(1, max_pages + 1):
-            self.logger.info(f"正在抓取第 {page} 页微博...")
+            log_extra = {'uid': uid, 'page': page}
             
             url = "https://m.weibo.cn/api/container/getIndex"
             params = {
@@ -88,45 +261,110 @@ class WeiboScraper:
             }
             
             try:
-                response = self.session.get(url, params=params)
+                start = time.perf_counter()
+                with self.profiler.phase('network'):
+                    response = self.fetch(url, params)
                 response.raise_for_status()
-                data = response.json()
+                latency = time.perf_counter() - start
+                self.logger.info("已获取第 %d 页微博，耗时 %.2f 秒", page, latency,
+                                 extra=dict(log_extra, latency=round(latency, 3)))
+                if is_visitor_wall(response):
+                    self._set_failure('visitor_wall')
+                    self.logger.warning("第 %d 页被重定向到游客验证页", page, extra=log_extra)
+                    break
+                if self.archive:
+                    with self.profiler.phase('archive'):
+                        self.archive.append(response.content, uid, page, containerid)
+                with self.profiler.phase('json_decode'):
+                    data = response.json()
                 
                 if data.get('ok') != 1:
-                    self.logger.warning(f"第 {page} 页请求失败")
+                    # 超出最后一页时接口同样返回 ok=0，只有第1页失败才算抓取失败
+                    if page == 1:
+                        self._set_failure('api_not_ok')
+                    self.logger.warning("第 %d 页请求失败", page, extra=log_extra)
                     break
                 
+                self.local.ok_responses += 1
                 cards = data.get('data', {}).get('cards', [])
                 if not cards:
-                    self.logger.info(f"第 {page} 页没有更多数据")
+                    self.logger.info("第 %d 页没有更多数据", page, extra=log_extra)
+                    break
+                self.local.ok_pages += 1
+                
+                with self.profiler.phase('parse'):
+                    page_weibos, stop_reason = self.parse_cards(cards, since_ts, until_ts, since_id)
+                weibos.extend(page_weibos)
+                
+                if stop_reason == 'seen':
+                    self.logger.info("第 %d 页遇到已抓取过的微博，停止翻页", page, extra=log_extra)
                     break
                 
-                for card in cards:
-                    if card.get('card_type') == 9:  # 微博卡片
-                        mblog = card.get('mblog')
-                        if mblog:
-                            weibo_data = self.parse_weibo_data(mblog)
-                            if weibo_data:
-                                weibos.append(weibo_data)
+                if stop_reason == 'before_since':
+                    self.logger.info("第 %d 页的微博均早于起始时间，停止翻页", page, extra=log_extra)
+                    break
                 
                 # 添加延时避免被封
-                time.sleep(2)
+                if self.page_delay:
+                    with self.profiler.phase('sleep'):
+                        time.sleep(self.page_delay)
                 
             except Exception as e:
-                self.logger.error(f"抓取第 {page} 页失败: {e}")
+                # 网络错误和限流不说明接口对该用户不可用，与 empty_cards 区分开
+                self._set_failure(request_failure(e))
+                self.logger.error("抓取第 %d 页失败: %s", page, e, extra=log_extra)
                 continue
         
         return weibos
     
-    def parse_weibo_data(self, mblog):
-        """解析微博数据"""
+    def parse_cards(self, cards, since_ts=None, until_ts=None, since_id=None):
+        """解析一页微博卡片，返回 (微博列表, 停止翻页的原因)，
+        原因为 'seen'（遇到已抓取过的微博）、'before_since'（整页早于时间窗口）或 None"""
+        weibos = []
+        # 本页是否有非置顶微博、其中是否有不早于 since 的
+        has_regular = False
+        reached_window = False
+        
+        for card in cards:
+            if card.get('card_type') == 9:  # 微博卡片
+                mblog = card.get('mblog')
+                if mblog:
+                    if since_id and int(mblog.get('id') or 0) <= since_id:
+                        # 置顶微博不按时间排序，只跳过；非置顶说明后面都是已抓取过的
+                        if is_pinned(mblog):
+                            continue
+                        return weibos, 'seen'
+                    
+                    if since_ts or until_ts:
+                        created = normalize_created_at(mblog.get('created_at'))
+                        ts = created.timestamp() if created else None
+                        if not is_pinned(mblog):
+                            has_regular = True
+                            if ts is None or not since_ts or ts >= since_ts:
+                                reached_window = True
+                        if ts is not None and ((since_ts and ts < since_ts) or (until_ts and ts > until_ts)):
+                            continue
+                    
+                    if self.dedup and self.dedup.is_seen(mblog.get('id')):
+                        continue
+                    
+                    weibo_data = self.parse_weibo_data(mblog)
+                    if weibo_data:
+                        weibos.append(weibo_data)
+        
+        if since_ts and has_regular and not reached_window:
+            return weibos, 'before_since'
+        return weibos, None
+    
+    def parse_weibo_data(self, mblog, scraped_at=None):
+        """解析微博数据，scraped_at 为抓取时间（离线解析时用于换算相对时间，默认当前时间）"""
         try:
             # 清理文本内容
             text = mblog.get('text', '')
             text_raw = mblog.get('text_raw', '')
             
-            # 移除HTML标签
-            text_clean = re.sub(r'<[^>]+>', '', text)
+            # 移除HTML标签，同时提取话题、@用户、链接和表情
+            text_clean, entities = parse_text_html(text)
             
             # 获取图片链接
             pics = []
@@ -138,20 +376,36 @@ class WeiboScraper:
             if mblog.get('page_info', {}).get('type') == 'video':
                 video_url = mblog.get('page_info', {}).get('urls', {}).get('mp4_720p_mp4', '')
             
-            # 转发微博信息
+            # 转发微博信息，使用去重存储时原微博单独缓存，这里只记录其ID
             retweeted_status = None
-            if mblog.get('retweeted_status'):
+            retweeted = mblog.get('retweeted_status')
+            retweeted_id = str(retweeted['id']) if retweeted and retweeted.get('id') else None
+            if self.dedup and retweeted_id:
+                if not self.dedup.has_original(retweeted_id):
+                    original = self.parse_weibo_data(retweeted, scraped_at)
+                    if original:
+                        self.dedup.add_original(original)
+            elif retweeted:
+                retweeted_text, retweeted_entities = parse_text_html(retweeted.get('text', ''))
                 retweeted_status = {
-                    'text': re.sub(r'<[^>]+>', '', mblog.get('retweeted_status', {}).get('text', '')),
+                    'text': retweeted_text,
                     'user_name': mblog.get('retweeted_status', {}).get('user', {}).get('screen_name', ''),
-                    'created_at': mblog.get('retweeted_status', {}).get('created_at', '')
+                    'created_at': mblog.get('retweeted_status', {}).get('created_at', ''),
+                    **retweeted_entities
                 }
             
+            created = normalize_created_at(mblog.get('created_at'), scraped_at)
+            
             return {
                 'id': mblog.get('id'),
                 'created_at': mblog.get('created_at'),
+                'created_timestamp': int(created.timestamp()) if created else None,
                 'text': text_clean,
                 'text_raw': text_raw,
+                'topics': entities['topics'],
+                'mentions': entities['mentions'],
+                'links': entities['links'],
+                'emoji': entities['emoji'],
                 'source': mblog.get('source', ''),
                 'reposts_count': mblog.get('reposts_count', 0),
                 'comments_count': mblog.get('comments_count', 0),
@@ -159,6 +413,7 @@ class WeiboScraper:
                 'pics': pics,
                 'video_url': video_url,
                 'retweeted_status': retweeted_status,
+                'retweeted_id': retweeted_id,
                 'user_id': mblog.get('user', {}).get('id'),
                 'user_name': mblog.get('user', {}).get('screen_name', ''),
                 'scheme': mblog.get('scheme', ''),
@@ -166,33 +421,18 @@ class WeiboScraper:
             }
             
         except Exception as e:
-            self.logger.error(f"解析微博数据失败: {e}")
+            self.logger.error("解析微博数据失败: %s", e, extra={'mblog_id': mblog.get('id'), 'sample': 'parse_error'})
             return None
     
-    def save_to_csv(self, data, filename):
-        """保存数据到CSV文件"""
-        try:
-            df = pd.DataFrame(data)
-            df.to_csv(filename, index=False, encoding='utf-8-sig')
-            self.logger.info(f"数据已保存到 {filename}")
-        except Exception as e:
-            self.logger.error(f"保存CSV文件失败: {e}")
-    
-    def save_to_json(self, data, filename):
-        """保存数据到JSON文件"""
-        try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"数据已保存到 {filename}")
-        except Exception as e:
-            self.logger.error(f"保存JSON文件失败: {e}")
-    
-    def scrape_user_weibos(self, uid, max_pages=10, save_format='both'):
-        """抓取指定用户的所有微博"""
+    def scrape_user_weibos(self, uid, max_pages=10, save_format=None, download_media=False,
+                           since=None, until=None, since_id=None, user_info=None):
+        """抓取指定用户的所有微博，since/until 可限定发布时间窗口，since_id 为上次抓取到的最新微博ID，
+        user_info 为已获取的用户信息（传入时不再请求）"""
         self.logger.info(f"开始抓取用户 {uid} 的微博数据...")
+        self._set_failure(None)
         
         # 获取用户信息
-        user_info = self.get_user_info(uid)
+        user_info = user_info or self.get_user_info(uid)
         if not user_info:
             self.logger.error("无法获取用户信息，请检查UID是否正确")
             return None
@@ -200,9 +440,18 @@ class WeiboScraper:
         self.logger.info(f"用户信息: {user_info['screen_name']} - 粉丝数: {user_info['followers_count']}")
         
         # 获取微博列表
-        weibos = self.get_user_weibo_list(uid, max_pages)
+        weibos = self.get_user_weibo_list(uid, max_pages, since=since, until=until, since_id=since_id)
         
         if not weibos:
+            if (since_id or self.dedup) and not self.last_failure() and self.local.ok_pages:
+                # 接口正常返回了微博，增量抓取或去重后没有新微博是正常情况
+                self.logger.info("没有新微博")
+                return {'user_info': user_info, 'weibos': [], 'output_dir': None}
+            if not user_info.get('statuses_count'):
+                self._set_failure(None)
+            elif not self.last_failure() and self.local.ok_responses:
+                # 用户有微博，接口正常返回但没有可用的卡片
+                self._set_failure('empty_cards')
             self.logger.warning("没有获取到微博数据")
             return None
         
@@ -217,14 +466,27 @@ class WeiboScraper:
         with open(user_info_file, 'w', encoding='utf-8') as f:
             json.dump(user_info, f, ensure_ascii=False, indent=2)
         
-        # 保存微博数据
-        if save_format in ['csv', 'both']:
-            csv_file = os.path.join(output_dir, 'weibos.csv')
-            self.save_to_csv(weibos, csv_file)
+        # 保存微博数据，格式和压缩方式默认按 OUTPUT_CONFIG
+        with self.profiler.phase('write'), StreamOutput(output_dir, save_format) as output:
+            for weibo in weibos:
+                output.write(weibo)
+        self.logger.info(f"数据已保存到 {', '.join(output.files)}")
+        
+        if self.dedup:
+            self.dedup.mark_seen(weibo['id'] for weibo in weibos)
         
-        if save_format in ['json', 'both']:
-            json_file = os.path.join(output_dir, 'weibos.json')
-            self.save_to_json(weibos, json_file)
+        if self.search_index:
+            self.search_index.add_weibos(weibos)
+        
+        # 下载图片和视频
+        if download_media:
+            with self.media_lock:
+                if self.media_downloader is None:
+                    self.media_downloader = MediaDownloader()
+            downloader = self.media_downloader
+            with self.profiler.phase('media_download'):
+                manifest = downloader.download_weibos(weibos)
+            downloader.save_manifest(manifest, os.path.join(output_dir, 'media_manifest.json'))
         
         return {
             'user_info': user_info,
@@ -234,7 +496,19 @@ class WeiboScraper:
 
 def main():
     """主函数 - 示例用法"""
-    scraper = WeiboScraper()
+    parser = argparse.ArgumentParser(description='微博用户作品数据爬虫')
+    parser.add_argument('--profile', action='store_true', help='输出各阶段耗时、cProfile热点和内存峰值')
+    args = parser.parse_args()
+    
+    profiler = create_profiler(args.profile)
+    archive = RawArchive() if ARCHIVE_CONFIG['enabled'] else None
+    search_index = None
+    if SEARCH_INDEX_CONFIG['enabled']:
+        # search_index 依赖本模块，在这里导入避免循环导入
+        from search_index import SearchIndex
+        search_index = SearchIndex()
+    scraper = WeiboScraper(proxy_pool=ProxyPool.from_config(), archive=archive, profiler=profiler,
+                           search_index=search_index)
     
     # 示例：抓取某个用户的微博（需要替换为实际的UID）
     # UID可以通过访问用户主页的URL获取，例如：https://weibo.com/u/1234567890
@@ -249,9 +523,22 @@ def main():
     except ValueError:
         max_pages = 10
     
+    try:
+        days = int(input("只抓取最近几天的微博（留空不限）: ").strip() or "0")
+    except ValueError:
+        days = 0
+    since = datetime.now(CST) - timedelta(days=days) if days > 0 else None
+    
+    download_media = input("是否下载图片和视频？(y/n, 默认n): ").strip().lower() == 'y'
+    
     print(f"开始抓取用户 {uid} 的微博数据...")
     
-    result = scraper.scrape_user_weibos(uid, max_pages=max_pages)
+    profiler.start()
+    result = scraper.scrape_user_weibos(uid, max_pages=max_pages, download_media=download_media,
+                                        since=since)
+    profiler.stop()
+    profiler.save(result['output_dir'] if result and result['output_dir'] else
+                  f"profile_{uid}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
     
     if result:
         print(f"\n抓取完成！")
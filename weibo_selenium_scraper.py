@@ -2,16 +2,19 @@
 # -*- coding: utf-8 -*-
 """
 微博用户作品数据爬虫 - Selenium版本
-支持处理更复杂的页面交互和反爬机制
+支持处理更复杂的页面交互和反爬机制；页面滚动时从浏览器性能日志中截获页面自己请求的接口JSON，
+用 WeiboScraper.parse_weibo_data 解析，输出格式与接口爬虫一致
 """
 
 import time
 import json
-import pandas as pd
 import logging
 import os
 import re
+import base64
+import argparse
 from datetime import datetime
+from urllib.parse import urlparse, parse_qs
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -20,22 +23,28 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from profiler import NullProfiler, create_profiler
+from log_setup import setup_logging
+from weibo_scraper import WeiboScraper, parse_user_info
+from output_writer import StreamOutput
+from config import WEIBO_CONFIG
+
+API_PATH = '/api/container/getIndex'
 
 class WeiboSeleniumScraper:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, profiler=None):
+        self.profiler = profiler or NullProfiler()
         self.setup_logging()
-        self.setup_driver(headless)
+        self.parser = WeiboScraper(profiler=self.profiler)
+        self.base_url = WEIBO_CONFIG['base_url']
+        self.pending = {}  # 已收到响应头、等待读取响应体的请求ID -> URL
+        self.captured = []  # 截获的 (containerid, 接口JSON)
+        with self.profiler.phase('driver_init'):
+            self.setup_driver(headless)
         
     def setup_logging(self):
         """设置日志"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('weibo_selenium_scraper.log', encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        setup_logging('weibo_selenium_scraper.log')
         self.logger = logging.getLogger(__name__)
         
     def setup_driver(self, headless=True):
@@ -51,6 +60,10 @@ class WeiboSeleniumScraper:
         chrome_options.add_argument('--window-size=1920,1080')
         chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
         
+        # 开启性能日志以截获页面发出的接口请求，只记录网络事件
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+        
         try:
             service = Service(ChromeDriverManager().install())
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
@@ -98,47 +111,72 @@ class WeiboSeleniumScraper:
             self.logger.error(f"登录失败: {e}")
             return False
     
+    def capture_api_responses(self):
+        """读取性能日志，保存页面请求的 getIndex 接口响应，返回本次新截获的数量"""
+        count = 0
+        with self.profiler.phase('capture'):
+            for entry in self.driver.get_log('performance'):
+                raw = entry['message']
+                # 大部分网络事件与接口无关，先按字符串过滤再解析JSON；
+                # 字符串过滤也会匹配 Network.responseReceivedExtraInfo 等事件，解析后再按方法名精确判断
+                if 'Network.responseReceived' in raw:
+                    if API_PATH not in raw:
+                        continue
+                    message = json.loads(raw)['message']
+                    if message.get('method') != 'Network.responseReceived':
+                        continue
+                    url = message['params']['response']['url']
+                    if API_PATH in url:
+                        self.pending[message['params']['requestId']] = url
+                elif 'Network.loadingFinished' in raw and self.pending:
+                    message = json.loads(raw)['message']
+                    if message.get('method') != 'Network.loadingFinished':
+                        continue
+                    request_id = message['params']['requestId']
+                    url = self.pending.pop(request_id, None)
+                    if url and self._read_response(request_id, url):
+                        count += 1
+        return count
+    
+    def _read_response(self, request_id, url):
+        """通过 DevTools 读取响应体并保存"""
+        try:
+            body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            text = base64.b64decode(body['body']).decode('utf-8') if body.get('base64Encoded') else body['body']
+            data = json.loads(text)
+        except Exception as e:
+            self.logger.warning(f"读取接口响应失败 {url}: {e}")
+            return False
+        containerid = parse_qs(urlparse(url).query).get('containerid', [''])[0]
+        self.captured.append((containerid, data))
+        return True
+    
     def get_user_profile(self, uid):
-        """获取用户资料"""
+        """打开用户主页，从页面请求的接口响应中获取用户资料"""
         try:
-            profile_url = f"https://m.weibo.cn/u/{uid}"
-            self.driver.get(profile_url)
-            time.sleep(3)
-            
-            # 获取用户基本信息
-            user_info = {}
+            profile_url = f"{self.base_url}/u/{uid}"
+            with self.profiler.phase('page_load'):
+                self.driver.get(profile_url)
+            with self.profiler.phase('sleep'):
+                time.sleep(3)
+            self.capture_api_responses()
             
-            try:
-                # 用户名
-                username_elem = self.wait.until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, ".m-text-cut"))
-                )
-                user_info['username'] = username_elem.text
-            except:
-                user_info['username'] = ''
+            user_info = None
+            for containerid, data in self.captured:
+                userinfo = data.get('data', {}).get('userInfo') if data.get('ok') == 1 else None
+                if containerid.startswith('100505') and userinfo:
+                    user_info = parse_user_info(userinfo)
+                    break
             
-            try:
-                # 粉丝数、关注数、微博数
-                stats_elems = self.driver.find_elements(By.CSS_SELECTOR, ".m-item-box .m-box-center .m-font-num")
-                if len(stats_elems) >= 3:
-                    user_info['weibo_count'] = stats_elems[0].text
-                    user_info['following_count'] = stats_elems[1].text
-                    user_info['followers_count'] = stats_elems[2].text
-            except:
-                user_info['weibo_count'] = '0'
-                user_info['following_count'] = '0'
-                user_info['followers_count'] = '0'
+            if user_info is None:
+                # 没有截获用户资料接口时，从微博中的作者信息取昵称
+                user_info = {'uid': uid, 'screen_name': ''}
+                for weibo in self.parse_captured_weibos():
+                    if str(weibo.get('user_id')) == str(uid):
+                        user_info['screen_name'] = weibo['user_name']
+                        break
             
-            try:
-                # 简介
-                desc_elem = self.driver.find_element(By.CSS_SELECTOR, ".m-text-box")
-                user_info['description'] = desc_elem.text
-            except:
-                user_info['description'] = ''
-            
-            user_info['uid'] = uid
             user_info['profile_url'] = profile_url
-            
             return user_info
             
         except Exception as e:
@@ -146,17 +184,21 @@ class WeiboSeleniumScraper:
             return None
     
     def scroll_and_load_weibos(self, max_scrolls=10):
-        """滚动页面加载更多微博"""
+        """滚动页面加载更多微博，每次滚动后截获新的接口响应"""
         scroll_count = 0
         last_height = self.driver.execute_script("return document.body.scrollHeight")
         
         while scroll_count < max_scrolls:
             # 滚动到页面底部
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(3)
+            with self.profiler.phase('scroll'):
+                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            with self.profiler.phase('sleep'):
+                time.sleep(3)
+            self.capture_api_responses()
             
             # 计算新的滚动高度
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
+            with self.profiler.phase('scroll'):
+                new_height = self.driver.execute_script("return document.body.scrollHeight")
             
             if new_height == last_height:
                 self.logger.info("已到达页面底部，没有更多内容")
@@ -166,73 +208,29 @@ class WeiboSeleniumScraper:
             scroll_count += 1
             self.logger.info(f"已滚动 {scroll_count} 次")
     
-    def extract_weibo_data(self):
-        """提取页面上的微博数据"""
+    def parse_captured_weibos(self):
+        """解析截获的微博列表接口响应，按微博ID去重"""
         weibos = []
-        
-        try:
-            # 查找所有微博卡片
-            weibo_cards = self.driver.find_elements(By.CSS_SELECTOR, ".m-item-box")
-            
-            for i, card in enumerate(weibo_cards):
-                try:
-                    weibo_data = {}
-                    
-                    # 微博文本内容
-                    try:
-                        text_elem = card.find_element(By.CSS_SELECTOR, ".m-text")
-                        weibo_data['text'] = text_elem.text
-                    except:
-                        weibo_data['text'] = ''
-                    
-                    # 发布时间
-                    try:
-                        time_elem = card.find_element(By.CSS_SELECTOR, ".m-font-gray")
-                        weibo_data['created_at'] = time_elem.text
-                    except:
-                        weibo_data['created_at'] = ''
-                    
-                    # 互动数据（点赞、评论、转发）
-                    try:
-                        action_elems = card.find_elements(By.CSS_SELECTOR, ".m-font-gray")
-                        weibo_data['interactions'] = []
-                        for elem in action_elems:
-                            if elem.text and any(keyword in elem.text for keyword in ['赞', '评论', '转发']):
-                                weibo_data['interactions'].append(elem.text)
-                    except:
-                        weibo_data['interactions'] = []
-                    
-                    # 图片链接
-                    try:
-                        img_elems = card.find_elements(By.CSS_SELECTOR, "img")
-                        weibo_data['images'] = [img.get_attribute('src') for img in img_elems if img.get_attribute('src')]
-                    except:
-                        weibo_data['images'] = []
-                    
-                    # 微博链接
-                    try:
-                        link_elem = card.find_element(By.CSS_SELECTOR, "a")
-                        weibo_data['link'] = link_elem.get_attribute('href')
-                    except:
-                        weibo_data['link'] = ''
-                    
-                    weibo_data['index'] = i
-                    weibos.append(weibo_data)
-                    
-                except Exception as e:
-                    self.logger.error(f"提取第 {i} 条微博数据失败: {e}")
+        seen_ids = set()
+        for containerid, data in self.captured:
+            if not containerid.startswith('107603') or data.get('ok') != 1:
+                continue
+            for card in data.get('data', {}).get('cards', []):
+                mblog = card.get('mblog') if card.get('card_type') == 9 else None
+                if not mblog or mblog.get('id') in seen_ids:
                     continue
-            
-            return weibos
-            
-        except Exception as e:
-            self.logger.error(f"提取微博数据失败: {e}")
-            return []
+                seen_ids.add(mblog.get('id'))
+                weibo = self.parser.parse_weibo_data(mblog)
+                if weibo:
+                    weibos.append(weibo)
+        return weibos
     
     def scrape_user_weibos(self, uid, max_scrolls=10, login_info=None):
         """抓取用户微博"""
         try:
             self.logger.info(f"开始抓取用户 {uid} 的微博...")
+            self.pending = {}
+            self.captured = []
             
             # 登录（如果提供了登录信息）
             if login_info:
@@ -244,15 +242,16 @@ class WeiboSeleniumScraper:
                 self.logger.error("无法获取用户信息")
                 return None
             
-            self.logger.info(f"用户: {user_info['username']}")
+            self.logger.info(f"用户: {user_info['screen_name']}")
             
             # 滚动加载微博
             self.scroll_and_load_weibos(max_scrolls)
             
-            # 提取微博数据
-            weibos = self.extract_weibo_data()
+            # 解析截获的接口数据
+            with self.profiler.phase('parse'):
+                weibos = self.parse_captured_weibos()
             
-            self.logger.info(f"成功提取 {len(weibos)} 条微博")
+            self.logger.info(f"截获 {len(self.captured)} 个接口响应，成功解析 {len(weibos)} 条微博")
             
             return {
                 'user_info': user_info,
@@ -263,8 +262,8 @@ class WeiboSeleniumScraper:
             self.logger.error(f"抓取失败: {e}")
             return None
     
-    def save_data(self, data, output_dir=None):
-        """保存数据"""
+    def save_data(self, data, output_dir=None, save_format=None):
+        """保存数据，格式和压缩方式默认按 OUTPUT_CONFIG"""
         if not output_dir:
             output_dir = f"weibo_selenium_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
@@ -276,17 +275,9 @@ class WeiboSeleniumScraper:
             json.dump(data['user_info'], f, ensure_ascii=False, indent=2)
         
         # 保存微博数据
-        weibos_json_file = os.path.join(output_dir, 'weibos.json')
-        with open(weibos_json_file, 'w', encoding='utf-8') as f:
-            json.dump(data['weibos'], f, ensure_ascii=False, indent=2)
-        
-        # 保存为CSV
-        try:
-            df = pd.DataFrame(data['weibos'])
-            csv_file = os.path.join(output_dir, 'weibos.csv')
-            df.to_csv(csv_file, index=False, encoding='utf-8-sig')
-        except Exception as e:
-            self.logger.error(f"保存CSV失败: {e}")
+        with self.profiler.phase('write'), StreamOutput(output_dir, save_format) as output:
+            for weibo in data['weibos']:
+                output.write(weibo)
         
         self.logger.info(f"数据已保存到 {output_dir}")
         return output_dir
@@ -298,14 +289,19 @@ class WeiboSeleniumScraper:
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='微博用户作品数据爬虫 - Selenium版本')
+    parser.add_argument('--profile', action='store_true', help='输出各阶段耗时、cProfile热点和内存峰值')
+    args = parser.parse_args()
+    
+    profiler = create_profiler(args.profile)
     scraper = None
+    started = False
+    output_dir = None
     try:
         # 询问是否使用无头模式
         headless_input = input("是否使用无头模式？(y/n, 默认y): ").strip().lower()
         headless = headless_input != 'n'
         
-        scraper = WeiboSeleniumScraper(headless=headless)
-        
         # 获取用户输入
         uid = input("请输入要抓取的微博用户UID: ").strip()
         if not uid:
@@ -326,14 +322,17 @@ def main():
             if username and password:
                 login_info = {'username': username, 'password': password}
         
-        # 开始抓取
+        # 开始抓取，浏览器启动也计入分析
+        profiler.start()
+        started = True
+        scraper = WeiboSeleniumScraper(headless=headless, profiler=profiler)
         result = scraper.scrape_user_weibos(uid, max_scrolls, login_info)
         
         if result:
             # 保存数据
             output_dir = scraper.save_data(result)
             print(f"\n抓取完成！")
-            print(f"用户: {result['user_info']['username']}")
+            print(f"用户: {result['user_info']['screen_name']}")
             print(f"获取微博数: {len(result['weibos'])}")
             print(f"数据保存在: {output_dir}")
         else:
@@ -346,6 +345,10 @@ def main():
     finally:
         if scraper:
             scraper.close()
+        # 中断或出错时同样保存分析报告
+        if started:
+            profiler.stop()
+            profiler.save(output_dir or f"weibo_selenium_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
 
 if __name__ == "__main__":
     main()